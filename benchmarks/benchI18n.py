@@ -0,0 +1,222 @@
+"""
+i18n.py 基准测试：比较原来三次 find_all 的实现、一次遍历的 BeautifulSoup 实现和 lxml 后端。
+
+三种实现的输出必须逐字节一致（未匹配中文也要一致），以原实现的输出为基准，不一致时报出文件和第一个不同的位置。
+默认使用随机生成的页面，也可以用 --html 指定真实页面目录、--keys 指定 key=value 格式的配置文件。
+
+计时之前先用 golden/i18n 中的固定页面检查：input 中的每个页面经过每种实现处理后，
+必须与 expected 中的同名文件逐字节一致，未匹配中文与 expected 中的 .unmatched.txt 一致。
+expected 由原实现生成，修改或新增页面后用 --update-golden 重新生成，并检查生成的结果。
+
+运行:
+    python -m benchmarks.benchI18n
+    python -m benchmarks.benchI18n --pages 500 --repeat 5
+    python -m benchmarks.benchI18n --html ./html --keys output-cn-utf8.txt
+    python -m benchmarks.benchI18n --update-golden
+"""
+import argparse
+import os
+import random
+import re
+import timeit
+
+from bs4 import BeautifulSoup
+from bs4 import Comment
+
+from scripts import i18n
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "i18n")
+
+# 原来的实现，保留在这里作为比较对象
+def legacy_replace_text_in_html(html_content, value_index, unmatched_texts, file_name):
+    soup = BeautifulSoup(html_content, 'lxml')
+    chinese_char_pattern = re.compile(r'[\u4e00-\u9fa5]+')
+
+    for element in soup.find_all(string=True):
+        if element.parent.name in {"script", "style"}:
+            continue
+        if isinstance(element, Comment):
+            continue
+        text = element.strip().replace("&nbsp", "").replace("&nbsp;", "").replace(" ", "")
+        if text:
+            match = chinese_char_pattern.search(text)
+            if match:
+                is_colon_ended = text.endswith(':') or text.endswith('：')
+                compare_text = text[:-1] if is_colon_ended else text
+                key = value_index.get(compare_text)
+                if key is not None:
+                    parent = element.parent
+                    if parent is not None and parent.name != '[document]':
+                        new_text = text.replace(compare_text, "")
+                        parent['data-i18n-text'] = key
+                        element.replace_with(new_text)
+                else:
+                    unmatched_texts[file_name].add(text)
+
+    for element in soup.find_all(attrs={"placeholder": True}):
+        placeholder = element['placeholder']
+        if chinese_char_pattern.search(placeholder):
+            key = value_index.get(placeholder)
+            if key is not None:
+                element['data-i18n-placeholder'] = key
+                element['placeholder'] = ""
+            else:
+                unmatched_texts[file_name].add(placeholder)
+
+    for tag in soup.find_all(True):
+        for attr in ["selected", "checked", "disabled", "readonly", "multiple", "stoprepeatedclick"]:
+            if attr in tag.attrs and tag.attrs[attr] == "":
+                tag.attrs[attr] = None
+
+    return soup.decode(formatter=None)
+
+IMPLEMENTATIONS = [
+    ("原实现", legacy_replace_text_in_html),
+    ("一次遍历", i18n.replace_text_in_html),
+    ("lxml", i18n.replace_text_in_html_lxml),
+]
+
+def random_chinese(rng, min_length, max_length):
+    return "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(rng.randint(min_length, max_length)))
+
+# 随机生成 key 表和页面：表格、表单、注释、脚本、<pre> 等，一部分中文不在 key 表中
+def generate_pages(pages, seed):
+    rng = random.Random(seed)
+    value_index = {random_chinese(rng, 2, 6): f"key.{i}" for i in range(500)}
+    values = list(value_index)
+
+    def text():
+        return rng.choice(values) if rng.random() < 0.8 else random_chinese(rng, 2, 6)
+
+    result = []
+    for page in range(pages):
+        rows = []
+        for _ in range(rng.randint(20, 80)):
+            rows.append(rng.choice([
+                f'<tr>\n  <td nowrap class=" label  left ">{text()}：</td>\n  <td><input type="text" placeholder="{text()}" disabled></td>\n</tr>',
+                f'<tr><td colspan="2"><select multiple><option value="1" selected>{text()}</option><option>{text()}</option></select></td></tr>',
+                f'<tr><td><button onclick="save(\'{text()}\')" stoprepeatedclick>{text()}</button> <a href="#" title=\'a"b\'>{text()}</a></td></tr>',
+                f'<tr><td><!-- {text()} --><label>&nbsp;{text()}:</label><br><span>{text()} {text()}</span></td></tr>',
+            ]))
+        result.append((f"page{page}.html", (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+            f'<title>{text()}</title>\n<style>td {{ padding: 2px; }}</style>\n'
+            f'<script>var message = "{text()}";</script>\n</head>\n<body>\n'
+            f'<pre>  {text()}\n\n</pre>\n<table>\n' + "\n".join(rows) + '\n</table>\n'
+            f'<textarea>\n</textarea>\n</body>\n</html>\n'
+        )))
+    return value_index, result
+
+def load_pages(html_dir, keys_file):
+    value_index, _ = i18n.build_value_index(i18n.load_config(keys_file))
+    pages = []
+    for html_file in sorted(i18n.get_html_files_from_directory(html_dir)):
+        pages.append((html_file, i18n.read_html_file(html_file)))
+    return value_index, pages
+
+def first_difference(expected, actual):
+    return next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+
+def read_golden():
+    value_index, _ = i18n.build_value_index(i18n.load_config(os.path.join(GOLDEN_DIR, "keys.txt")))
+    input_dir = os.path.join(GOLDEN_DIR, "input")
+    pages = [(name, i18n.read_html_file(os.path.join(input_dir, name))) for name in sorted(os.listdir(input_dir))]
+    return value_index, pages
+
+# 用原实现重新生成 expected
+def update_golden():
+    value_index, pages = read_golden()
+    expected_dir = os.path.join(GOLDEN_DIR, "expected")
+    os.makedirs(expected_dir, exist_ok=True)
+    for name, html_content in pages:
+        unmatched_texts = {name: set()}
+        html = legacy_replace_text_in_html(html_content, value_index, unmatched_texts, name)
+        with open(os.path.join(expected_dir, name), "w", encoding="utf-8", newline="") as f:
+            f.write(html)
+        with open(os.path.join(expected_dir, name + ".unmatched.txt"), "w", encoding="utf-8", newline="") as f:
+            f.writelines(f"{text}\n" for text in sorted(unmatched_texts[name]))
+    print(f"已更新 {len(pages)} 个 golden 页面: {expected_dir}")
+
+# 检查每种实现的输出是否与 expected 中的文件一致
+def verify_golden():
+    value_index, pages = read_golden()
+    expected_dir = os.path.join(GOLDEN_DIR, "expected")
+    mismatches = []
+    for name, html_content in pages:
+        with open(os.path.join(expected_dir, name), "r", encoding="utf-8", newline="") as f:
+            expected_html = f.read()
+        with open(os.path.join(expected_dir, name + ".unmatched.txt"), "r", encoding="utf-8") as f:
+            expected_unmatched = set(f.read().splitlines())
+        for label, replace in IMPLEMENTATIONS:
+            unmatched_texts = {name: set()}
+            html = replace(html_content, value_index, unmatched_texts, name)
+            if html != expected_html:
+                mismatches.append(f"{label} golden/{name}: 第 {first_difference(expected_html, html)} 个字符开始不同")
+            elif unmatched_texts[name] != expected_unmatched:
+                mismatches.append(f"{label} golden/{name}: 未匹配中文不同")
+    return mismatches
+
+# 以原实现的输出为基准，检查其它实现是否逐字节一致
+def verify(value_index, pages):
+    mismatches = []
+    for name, html_content in pages:
+        results = []
+        for _, replace in IMPLEMENTATIONS:
+            unmatched_texts = {name: set()}
+            results.append((replace(html_content, value_index, unmatched_texts, name), unmatched_texts[name]))
+        expected_html, expected_unmatched = results[0]
+        for (label, _), (html, unmatched) in zip(IMPLEMENTATIONS[1:], results[1:]):
+            if html != expected_html:
+                mismatches.append(f"{label} {name}: 第 {first_difference(expected_html, html)} 个字符开始不同")
+            elif unmatched != expected_unmatched:
+                mismatches.append(f"{label} {name}: 未匹配中文不同")
+    return mismatches
+
+def run_benchmarks(value_index, pages, repeat):
+    results = []
+    for label, replace in IMPLEMENTATIONS:
+        def run():
+            for name, html_content in pages:
+                replace(html_content, value_index, {name: set()}, name)
+        results.append((label, min(timeit.repeat(run, number=1, repeat=repeat))))
+    return results
+
+def print_report(pages, results):
+    total = sum(len(html_content) for _, html_content in pages)
+    print(f"{len(pages)} 个页面, {total / 1024 / 1024:.1f} MB")
+    print(f"{'实现':<12}{'耗时(s)':>10}{'加速':>10}")
+    legacy = results[0][1]
+    for label, elapsed in results:
+        print(f"{label:<12}{elapsed:>10.3f}{legacy / elapsed:>9.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="i18n.py 页面替换基准测试")
+    parser.add_argument("--pages", type=int, default=200, help="随机生成的页面数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+    parser.add_argument("--html", help="真实页面目录，替代随机生成的页面")
+    parser.add_argument("--keys", help="与 --html 一起使用的 key=value 配置文件")
+    parser.add_argument("--update-golden", action="store_true", help="用原实现重新生成 golden/i18n/expected")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden()
+        return
+    mismatches = verify_golden()
+    if mismatches:
+        raise RuntimeError("输出与 golden 文件不一致:\n" + "\n".join(mismatches))
+
+    if args.html:
+        if not args.keys or not os.path.exists(args.keys):
+            parser.error("--html 需要同时指定存在的 --keys 配置文件")
+        value_index, pages = load_pages(args.html, args.keys)
+    else:
+        value_index, pages = generate_pages(args.pages, args.seed)
+
+    mismatches = verify(value_index, pages)
+    if mismatches:
+        raise RuntimeError("输出与原实现不一致:\n" + "\n".join(mismatches[:20]))
+    print_report(pages, run_benchmarks(value_index, pages, args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+scanChinese.py 扫描基准测试：比较原来先用三次 re.sub 删除注释、再 findall 中文的实现和现在一次遍历的 iter_chinese_text。
+
+测试数据为随机生成的中文密集的 JS 和 Vue 源码：几乎每行都有字符串、模板字符串、属性或注释中的中文，
+另有除法和正则字面量。生成的代码中注释标记不会出现在字符串里，两种实现提取的中文必须一致。
+
+运行:
+    python -m benchmarks.benchScan
+    python -m benchmarks.benchScan --lines 100000 --repeat 5
+"""
+import argparse
+import random
+import re
+import timeit
+
+from scripts import scanChinese
+
+# 原来的实现，保留在这里作为比较对象
+def legacy_chinese_text(content):
+    content = re.sub(re.compile(r'<!--.*?-->', re.DOTALL), '', content)
+    content = re.sub(re.compile(r'/\*.*?\*/', re.DOTALL), '', content)
+    content = re.sub(re.compile(r'//.*'), '', content)
+    return re.compile(r'[\u4e00-\u9fff]+').findall(content)
+
+def random_chinese(rng, min_length, max_length):
+    return "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(rng.randint(min_length, max_length)))
+
+def generate_js(rng, lines):
+    result = []
+    for i in range(lines):
+        result.append(rng.choice([
+            f"  message: '{random_chinese(rng, 2, 8)}', // {random_chinese(rng, 2, 8)}",
+            f"  this.$message.error(\"{random_chinese(rng, 2, 8)}：\" + name + \"{random_chinese(rng, 2, 8)}\");",
+            f"  const label{i} = `{random_chinese(rng, 2, 8)}${{count}}{random_chinese(rng, 2, 8)}`;",
+            f"  if (a > b) {{ return {{ title: '{random_chinese(rng, 2, 8)}', ok: true }}; }}",
+            f"  /* {random_chinese(rng, 2, 8)} */ total = total / 2;",
+            f"  rules.push({{ pattern: /^[a-z]+$/, message: '{random_chinese(rng, 2, 8)}' }});",
+            "  x = y + 1;",
+        ]))
+    return "\n".join(result)
+
+def generate_vue(rng, lines):
+    template = []
+    for i in range(lines // 2):
+        if i % 3:
+            template.append(f'    <el-form-item label="{random_chinese(rng, 2, 8)}" prop="name">'
+                            f'<el-input v-model="form.name" placeholder="{random_chinese(rng, 2, 8)}"></el-input></el-form-item>')
+        else:
+            template.append(f'    <span class="tip">{random_chinese(rng, 2, 8)}</span><!-- {random_chinese(rng, 2, 8)} -->')
+    return ("<template>\n  <div>\n" + "\n".join(template) + "\n  </div>\n</template>\n"
+            "<script>\nexport default {\n" + generate_js(rng, lines // 2) + "\n}\n</script>\n")
+
+# 生成两组测试数据：(名称, 源码, 是否按 HTML 扫描)
+def datasets(lines, seed):
+    rng = random.Random(seed)
+    return [
+        ("JS", generate_js(rng, lines), False),
+        ("Vue", generate_vue(rng, lines), True),
+    ]
+
+def run_benchmarks(lines, repeat, seed):
+    results = []
+    for name, content, markup in datasets(lines, seed):
+        if [text for text, _, _ in scanChinese.iter_chinese_text(content, markup)] != legacy_chinese_text(content):
+            raise RuntimeError(f"{name}: 提取的中文与原实现不一致")
+        legacy = min(timeit.repeat(lambda: legacy_chinese_text(content), number=1, repeat=repeat))
+        current = min(timeit.repeat(lambda: list(scanChinese.iter_chinese_text(content, markup)), number=1, repeat=repeat))
+        results.append((name, len(content), legacy, current))
+    return results
+
+def print_report(lines, results):
+    print(f"每组 {lines} 行")
+    print(f"{'数据':<8}{'大小(MB)':>10}{'原实现(s)':>12}{'一次遍历(s)':>14}{'相对原实现':>12}")
+    for name, size, legacy, current in results:
+        print(f"{name:<8}{size / 1024 / 1024:>10.1f}{legacy:>12.3f}{current:>14.3f}{current / legacy:>11.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="scanChinese.py 中文扫描基准测试")
+    parser.add_argument("--lines", type=int, default=60000, help="每组源码的行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最快一次")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+    args = parser.parse_args()
+
+    print_report(args.lines, run_benchmarks(args.lines, args.repeat, args.seed))
+
+if __name__ == "__main__":
+    main()
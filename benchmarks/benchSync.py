@@ -0,0 +1,271 @@
+"""
+同步脚本基准测试：在本进程内启动 SSH/SCP 服务，不需要真实服务器和网络。
+
+服务端基于 paramiko 的 ServerInterface，收到的 exec 命令（scp -t、mkdir、tar、python 等）
+直接交给本机 bash 在临时目录中执行，所以需要在 Linux 上运行。多台服务器用 127.0.0.x
+模拟，每个地址对应一个独立的目标目录。
+
+运行:
+    python -m benchmarks.benchSync
+    python -m benchmarks.benchSync --hosts 3 --scale 0.5 --save baseline.json
+    python -m benchmarks.benchSync --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import paramiko
+
+from scripts import syncGitFilesToRemote as sync
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+
+# 增量传输场景中发送的字节数不能超过文件大小的这个比例
+DELTA_MAX_RATIO = 0.1
+
+# 接受任意密码，exec 命令在该连接对应的目标目录中执行
+class StandInServer(paramiko.ServerInterface):
+    def __init__(self, root):
+        self.root = root
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=run_command, args=(channel, command.decode("utf-8"), self.root), daemon=True).start()
+        return True
+
+# 在 bash 中执行命令，并在 SSH 通道和子进程之间转发 stdin/stdout/stderr
+def run_command(channel, command, root):
+    process = subprocess.Popen(
+        ["bash", "-c", command], cwd=root,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+
+    def pump_stdin():
+        try:
+            for data in iter(lambda: channel.recv(65536), b""):
+                process.stdin.write(data)
+                process.stdin.flush()
+        except (OSError, EOFError):
+            pass
+        finally:
+            with contextlib.suppress(OSError):
+                process.stdin.close()
+
+    def pump_stderr():
+        for data in iter(lambda: process.stderr.read1(65536), b""):
+            channel.sendall_stderr(data)
+
+    threading.Thread(target=pump_stdin, daemon=True).start()
+    stderr_thread = threading.Thread(target=pump_stderr, daemon=True)
+    stderr_thread.start()
+    for data in iter(lambda: process.stdout.read1(65536), b""):
+        channel.sendall(data)
+    exit_status = process.wait()
+    stderr_thread.join()
+    channel.send_exit_status(exit_status)
+    channel.close()
+
+# 本地 SSH 服务，按连接的目标地址 (127.0.0.x) 区分服务器
+class LocalSSHServer:
+    def __init__(self, roots):
+        self.roots = roots  # {地址: 目标目录}
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("0.0.0.0", 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.transports = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            root = self.roots.get(client.getsockname()[0])
+            if root is None:
+                client.close()
+                continue
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(HOST_KEY)
+            transport.start_server(server=StandInServer(root))
+            self.transports.append(transport)
+
+    def close(self):
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+# 生成测试目录：大量小文件、少量大文件、深层嵌套目录
+def generate_tree(root, scale):
+    tiny_count = max(1, int(2000 * scale))
+    for i in range(tiny_count):
+        write_file(os.path.join(root, "tiny", f"d{i % 50}", f"f{i}.js"), os.urandom(64) * 16)
+    # 大文件不小于 2MB，保证超过默认的增量传输阈值；扩展名不在 DELTA_SKIP_EXTENSIONS 中，会走增量传输
+    for i in range(3):
+        write_file(os.path.join(root, "huge", f"bundle{i}.bin"), os.urandom(max(2 * 1024 * 1024, int(16 * 1024 * 1024 * scale))))
+    deep = os.path.join(root, "deep")
+    for level in range(30):
+        deep = os.path.join(deep, f"level{level}")
+        for i in range(max(1, int(10 * scale))):
+            write_file(os.path.join(deep, f"f{i}.css"), os.urandom(512))
+    subprocess.run(["git", "init", "-q", root], check=True)
+
+# 在大文件中间插入几个字节，用于测量增量传输
+def touch_huge_files(root):
+    for name in sorted(os.listdir(os.path.join(root, "huge"))):
+        path = os.path.join(root, "huge", name)
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:len(data) // 2] + b"changed" + data[len(data) // 2:])
+
+def tree_stats(root):
+    files = total = 0
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for name in names:
+            files += 1
+            total += os.path.getsize(os.path.join(directory, name))
+    return files, total
+
+# 执行一次全量同步并返回耗时，任一服务器失败时抛出异常
+# expect_delta 为 True 时，还要求每台服务器都用了增量传输，且发送的字节数远小于文件大小
+def run_sync(source, hosts, port, expect_delta=False, **params):
+    sync.connection_pool.close_all()
+    argv = sys.argv
+    sys.argv = [argv[0], "--mode", "full"]
+    output = io.StringIO()
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(output):
+            sync.main(
+                input_folder=source, remote_server=",".join(hosts), prot=str(port),
+                username="bench", password="bench", remote_folder="./", **params,
+            )
+    finally:
+        sys.argv = argv
+    elapsed = time.time() - start
+    text = output.getvalue()
+    if "失败 0 台" not in text:
+        raise RuntimeError(f"同步失败:\n{text[-2000:]}")
+    if expect_delta:
+        with open(os.path.join(sync.CACHE_DIR, "metrics.jsonl"), "r", encoding="utf-8") as f:
+            summary = json.loads(f.readlines()[-1])
+        for metrics in summary["hosts"]:
+            if not metrics["delta_time"] > 0 or metrics["bytes"] > metrics["source_bytes"] * DELTA_MAX_RATIO:
+                raise RuntimeError(f"{metrics['server']} 没有使用增量传输: delta_time={metrics['delta_time']}, "
+                                   f"bytes={metrics['bytes']}, source_bytes={metrics['source_bytes']}")
+    return elapsed
+
+def scenarios(host_count):
+    multi = [f"127.0.0.{i}" for i in range(1, host_count + 1)]
+    single = multi[:1]
+    return [
+        ("逐个文件 单台", single, {"transfer_mode": "file", "use_manifest": "否", "delta_threshold": "0"}),
+        ("打包传输 单台", single, {"transfer_mode": "bundle", "use_manifest": "否", "delta_threshold": "0"}),
+        (f"打包传输 {host_count} 台", multi, {"transfer_mode": "bundle", "use_manifest": "否", "delta_threshold": "0"}),
+        (f"清单比对 {host_count} 台（无变化）", multi, {"transfer_mode": "bundle", "use_manifest": "是"}),
+        (f"增量传输 {host_count} 台（大文件小改动）", multi, {"transfer_mode": "bundle", "use_manifest": "是"}),
+    ]
+
+def run_benchmarks(scale, host_count):
+    workdir = tempfile.mkdtemp(prefix="benchSync-")
+    source = os.path.join(workdir, "source")
+    roots = {f"127.0.0.{i}": os.path.join(workdir, f"host{i}") for i in range(1, host_count + 1)}
+    for root in roots.values():
+        os.makedirs(root)
+    generate_tree(source, scale)
+    files, total = tree_stats(source)
+
+    cache_dir = sync.CACHE_DIR
+    sync.CACHE_DIR = os.path.join(workdir, "cache")  # 不污染真实的清单缓存和统计记录
+    server = LocalSSHServer(roots)
+    results = []
+    try:
+        for name, hosts, params in scenarios(host_count):
+            if name.startswith("增量传输"):
+                touch_huge_files(source)
+            elif params["use_manifest"] == "是":
+                # 先同步一次建立远程清单，再测量没有变化时的耗时
+                run_sync(source, hosts, server.port, **params)
+            else:
+                for root in roots.values():
+                    shutil.rmtree(root)
+                    os.makedirs(root)
+            elapsed = run_sync(source, hosts, server.port, name.startswith("增量传输"), **params)
+            results.append({
+                "name": name,
+                "hosts": len(hosts),
+                "wall_time": round(elapsed, 3),
+                "files_per_sec": round(files * len(hosts) / elapsed, 1),
+                "mb_per_sec": round(total * len(hosts) / elapsed / 1024 / 1024, 2),
+            })
+    finally:
+        server.close()
+        sync.CACHE_DIR = cache_dir
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"files": files, "bytes": total, "results": results}
+
+def print_report(report):
+    print(f"测试目录: {report['files']} 个文件, {report['bytes'] / 1024 / 1024:.1f} MB")
+    print(f"{'场景':<28}{'耗时(s)':>10}{'文件/s':>12}{'MB/s':>10}")
+    for result in report["results"]:
+        print(f"{result['name']:<28}{result['wall_time']:>10.2f}{result['files_per_sec']:>12.1f}{result['mb_per_sec']:>10.2f}")
+
+# 与基线比较，任一场景耗时超过基线的 (1 + tolerance) 倍即视为性能回退
+def compare(report, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = baseline.get(result["name"])
+        if base and result["wall_time"] > base["wall_time"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: {base['wall_time']:.2f}s -> {result['wall_time']:.2f}s")
+    for line in regressions:
+        print(f"性能回退 {line}")
+    return not regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="syncGitFilesToRemote 本地基准测试")
+    parser.add_argument("--scale", type=float, default=1.0, help="测试目录规模倍数")
+    parser.add_argument("--hosts", type=int, default=3, help="模拟的服务器数量")
+    parser.add_argument("--save", help="把结果保存为 JSON，作为以后比较的基线")
+    parser.add_argument("--compare", help="与之前保存的基线 JSON 比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许比基线慢的比例")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.scale, args.hosts)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+concat.py unicode 转义基准测试：比较原来逐字符生成 f-string 的 to_unicode 和现在的转义表实现。
+
+测试数据为随机生成的翻译文本：纯中文、中英混合、带 emoji（辅助平面字符）三组。
+原实现把辅助平面字符输出为 \\u1f600 这样的错误转义，所以只对不含辅助平面字符的数据校验结果一致。
+
+运行:
+    python -m benchmarks.benchUnicode
+    python -m benchmarks.benchUnicode --rows 200000 --repeat 5
+"""
+import argparse
+import random
+import timeit
+
+from scripts import concat
+
+# 原来的实现，保留在这里作为比较对象
+def legacy_to_unicode(text):
+    if not text:
+        return ""
+    return "".join(f"\\u{ord(char):04x}" for char in text)
+
+def random_text(rng, alphabet, min_length, max_length):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(min_length, max_length)))
+
+# 生成三组测试数据
+def datasets(rows, seed):
+    rng = random.Random(seed)
+    chinese = [chr(code) for code in range(0x4E00, 0x9FA6)]
+    ascii_chars = [chr(code) for code in range(0x20, 0x7F)]
+    emoji = [chr(code) for code in range(0x1F600, 0x1F650)]
+    return [
+        ("纯中文", [random_text(rng, chinese, 2, 30) for _ in range(rows)], True),
+        ("中英混合", [random_text(rng, chinese + ascii_chars * 30, 5, 60) for _ in range(rows)], True),
+        ("含 emoji", [random_text(rng, chinese * 5 + emoji, 2, 30) for _ in range(rows)], False),
+    ]
+
+def run_benchmarks(rows, repeat, seed):
+    results = []
+    for name, values, comparable in datasets(rows, seed):
+        if comparable and [legacy_to_unicode(value) for value in values] != concat.to_unicode_column(values):
+            raise RuntimeError(f"{name}: 转义结果与原实现不一致")
+        legacy = min(timeit.repeat(lambda: [legacy_to_unicode(value) for value in values], number=1, repeat=repeat))
+        single = min(timeit.repeat(lambda: [concat.to_unicode(value) for value in values], number=1, repeat=repeat))
+        column = min(timeit.repeat(lambda: concat.to_unicode_column(values), number=1, repeat=repeat))
+        results.append((name, legacy, single, column))
+    return results
+
+def print_report(rows, results):
+    print(f"每组 {rows} 行")
+    print(f"{'数据':<12}{'原实现(s)':>12}{'to_unicode(s)':>16}{'整列(s)':>12}{'加速':>10}")
+    for name, legacy, single, column in results:
+        print(f"{name:<12}{legacy:>12.3f}{single:>16.3f}{column:>12.3f}{legacy / column:>9.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="concat.py unicode 转义基准测试")
+    parser.add_argument("--rows", type=int, default=100000, help="每组数据的行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+    args = parser.parse_args()
+
+    print_report(args.rows, run_benchmarks(args.rows, args.repeat, args.seed))
+
+if __name__ == "__main__":
+    main()
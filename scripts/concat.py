@@ -1,75 +1,193 @@
+import contextlib
+import filecmp
+import hashlib
+import json
 import os
 import requests
 import shutil
 import string
 import openpyxl
 
+# str.translate 用的转义表：字符第一次出现时生成 \uXXXX 转义并缓存，之后直接查表
+class UnicodeEscapeTable(dict):
+    def __missing__(self, code):
+        if code > 0xFFFF:
+            # 辅助平面字符（如 emoji）按 UTF-16 代理对输出两个 \uXXXX，与 Java .properties 一致
+            offset = code - 0x10000
+            escaped = f"\\u{0xD800 + (offset >> 10):04x}\\u{0xDC00 + (offset & 0x3FF):04x}"
+        else:
+            escaped = f"\\u{code:04x}"
+        self[code] = escaped
+        return escaped
+
+UNICODE_ESCAPE_TABLE = UnicodeEscapeTable()
+
 def to_unicode(text):
     if not text:
         return ""
-    return "".join(f"\\u{ord(char):04x}" for char in text)
-
+    return text.translate(UNICODE_ESCAPE_TABLE)
+
+# 整列转义，所有值共用同一张转义表
+def to_unicode_column(values):
+    translate = str.translate
+    return [translate(str(value), UNICODE_ESCAPE_TABLE) for value in values]
+
+# 输出文件的写缓冲大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+# 每批渲染的行数
+RENDER_CHUNK_ROWS = 5000
+# 保存在输出目录中的缓存文件：表格指纹和上次生成的文件状态
+EXPORT_CACHE_FILE = ".concat_cache.json"
+# 解析后的行单独保存，一行一个 JSON 数组，写入和读取都按批进行，不在内存中保留整张表
+EXPORT_ROWS_FILE = ".concat_rows.jsonl"
+
+# 只遍历一次行，同时写出所有输出文件：第 i 个文件取第一列和其后第 i+1 列的值
+# 先写到临时文件，全部写完后只替换内容有变化的文件，避免生成一半的文件和无意义的修改时间变化
 def process_excel_and_generate_txt(
-    input_file,  # 输入的 .xlsx 文件路径
-    output_file,  # 输出的 .txt 文件路径
-    col1,  # 第一列的列名或索引 (如 'A' 或 1)
-    col2,  # 第二列的列名或索引 (如 'B' 或 2)
-    sheet_name,  # 选择的表名
-    template,
+    chunks,  # read_row_chunks 按批产生的行，每行第一个值为第一列
+    output_files,  # 输出的 .txt 文件路径列表，文件名带 * 时对值做 unicode 转义
+    render,  # compile_template 编译出的行渲染函数
 ):
 
-    try:
-        # 加载 Excel 文件
-        wb = openpyxl.load_workbook(input_file)
-        sheet = wb[sheet_name]  # 根据用户选择的表加载
-
-        # 处理列名为字母或索引的情况
-        col1_idx = col1 if isinstance(col1, int) else openpyxl.utils.column_index_from_string(col1)
-        col2_idx = col2 if isinstance(col2, int) else openpyxl.utils.column_index_from_string(col2)
-
+    # 每个输出文件对应的 (路径, 是否转义)
+    outputs = []
+    for output_file in output_files:
         encoding_type = len(output_file.split("*"))
-        output_file = output_file.split("*")[0]
-
-        # 打开输出文件
-        with open(output_file, "w", encoding="utf-8") as txt_file:
-            for row in sheet.iter_rows(min_row=2):  # 从第2行开始，跳过表头
-                value1 = row[col1_idx - 1].value  # 获取第 col1 列的值
-                value2 = row[col2_idx - 1].value  # 获取第 col2 列的值
-
-                # 如果有空值，用空字符串代替
-                value1 = value1 if value1 is not None else ""
-                value2 = value2 if value2 is not None else ""
-
-                if encoding_type == 2:
-                    value2 = to_unicode(str(value2))
-
-                # 将两列的值通过连接符拼接
-                combined = template_replace(template,{"A":value1, "B":value2}) + "\n"
-
-                if value1 == "":
-                    return
-
-                # 写入到输出文件
-                txt_file.write(combined)
+        outputs.append((output_file.split("*")[0], encoding_type == 2))
 
-        print(f"生成完成！文件已保存到: {output_file}")
+    try:
+        # 同时打开所有输出文件，使用较大的写缓冲
+        with contextlib.ExitStack() as stack:
+            writers = [
+                stack.enter_context(open(path + ".tmp", "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE))
+                for path, _ in outputs
+            ]
+            for chunk in chunks:
+                keys = [row[0] for row in chunk]
+                for i, ((_, escape), txt_file) in enumerate(zip(outputs, writers)):
+                    values = [row[i + 1] for row in chunk]
+                    if escape:
+                        values = to_unicode_column(values)
+                    # 整批按模板拼接，每个文件每批只写一次
+                    txt_file.write("".join(map(render, keys, values)))
+
+        result = {}
+        for path, _ in outputs:
+            if replace_if_changed(path):
+                print(f"生成完成！文件已保存到: {path}")
+            else:
+                print(f"文件内容没有变化: {path}")
+            stat = os.stat(path)
+            result[path] = [stat.st_size, stat.st_mtime_ns]
+        return result
 
     except Exception as e:
         print(f"发生错误: {e}")
-
-def template_replace(template, data):
+    finally:
+        for path, _ in outputs:
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+# 用写好的临时文件替换原文件，内容相同时保留原文件
+def replace_if_changed(path):
+    tmp_path = path + ".tmp"
+    if os.path.isfile(path) and filecmp.cmp(tmp_path, path, shallow=False):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+# 读取从第2行开始的 column_count 列，遇到第一列为空的行就结束，值统一转为字符串，空值用空字符串代替
+def iter_sheet_rows(sheet, col1_idx, column_count):
+    for row in sheet.iter_rows(min_row=2, min_col=col1_idx, max_col=col1_idx + column_count - 1, values_only=True):
+        if row[0] is None or row[0] == "":
+            break
+        yield ["" if value is None else str(value) for value in row]
+
+# 逐行读取缓存的行
+def iter_cached_rows(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+# 把行按 RENDER_CHUNK_ROWS 分批
+def read_row_chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= RENDER_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# 边导出边把每批行追加到缓存文件
+def cache_row_chunks(chunks, rows_file):
+    for chunk in chunks:
+        rows_file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk))
+        yield chunk
+
+# 表格文件指纹：大小和修改时间没变时沿用上次的 sha1，否则重新计算
+def source_fingerprint(path, cached):
+    stat = os.stat(path)
+    if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1.hexdigest()}
+
+def load_export_cache(output_folder):
+    try:
+        with open(os.path.join(output_folder, EXPORT_CACHE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_export_cache(output_folder, cache):
+    path = os.path.join(output_folder, EXPORT_CACHE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+# 上次生成的文件都还在且没有被改动过
+def outputs_unchanged(cached_outputs, output_files):
+    if not cached_outputs:
+        return False
+    for output_file in output_files:
+        path = output_file.split("*")[0]
+        if not os.path.isfile(path):
+            return False
+        stat = os.stat(path)
+        if cached_outputs.get(path) != [stat.st_size, stat.st_mtime_ns]:
+            return False
+    return True
+
+def compile_template(template):
     """
-    根据传入的模板字符串和数据进行替换
-    :param template: 模板字符串，使用 $ 标识变量
-    :param data: 包含替换数据的字典
-    :return: 替换后的字符串
+    把模板字符串编译为行渲染函数，每次导出只解析一次
+    :param template: 模板字符串，$A 为第一列，$B 为对应语言列，$$ 表示 $ 本身
+    :return: render(value1, value2)，返回拼接好并带换行的一行
     """
-    template_obj = string.Template(template)
-    try:
-        return template_obj.substitute(data)
-    except KeyError as e:
-        print(f"Error: 缺少必要的替换数据 {e}")
-        return template
+    fields = {"A": "{0}", "B": "{1}"}
+    parts = []
+    last = 0
+    for match in string.Template.pattern.finditer(template):
+        # 模板中的普通文本原样保留，花括号需要转义
+        parts.append(template[last:match.start()].replace("{", "{{").replace("}", "}}"))
+        last = match.end()
+        if match.group("escaped") is not None:
+            parts.append("$")
+            continue
+        name = match.group("named") or match.group("braced")
+        if name is None:
+            raise ValueError(f"模板格式错误: 第 {match.start() + 1} 个字符处的 $ 后面不是变量名，如需输出 $ 请写成 $$")
+        if name not in fields:
+            raise ValueError(f"模板格式错误: 未知变量 ${name}，只能使用 $A（第一列）和 $B（语言列）")
+        parts.append(fields[name])
+    parts.append(template[last:].replace("{", "{{").replace("}", "}}"))
+    return ("".join(parts) + "\n").format
 
 def fill_list_with_single_element(lst, length):
     if len(lst) == 1:
@@ -79,30 +197,58 @@ def fill_list_with_single_element(lst, length):
 
 def main(**params):
 
-    selected_file = params["input_folder"]
-    wb = openpyxl.load_workbook(selected_file)
-
-    # 列出表名并让用户选择
-    sheet_names = wb.sheetnames
-    sheet_choice = int(params["tabel_index"]) - 1
-    
-    selected_sheet = sheet_names[sheet_choice]
-
-    export_file = params["file_name"].split(",") 
-
-    max_length = len(export_file)
-
+    # 先编译模板，模板有误时在读取表格前直接报错
     template = params["template"] or "$A = $B"
+    render = compile_template(template)
 
-    for i in range(max_length):
-        process_excel_and_generate_txt(
-            input_file=selected_file,  # 输入文件名
-            sheet_name=selected_sheet,  # 用户选择的表名
-            output_file=params["remote_folder"]+ "/" +export_file[i],  # 输出文件名
-            col1="A",  # 第一列
-            col2=chr(ord("B")+i),  # 第二列
-            template=template,
-            )
+    selected_file = params["input_folder"]
+    sheet_choice = int(params["tabel_index"]) - 1
+    export_file = params["file_name"].split(",")
+    output_folder = params["remote_folder"]
+    output_files = [output_folder + "/" + name for name in export_file]  # 输出文件名
+    column_count = len(export_file) + 1  # 第一列，其后各列依次对应各个输出文件
+
+    cache = load_export_cache(output_folder)
+    source = source_fingerprint(selected_file, cache.get("source"))
+    params_key = [template, export_file]
+    rows_path = os.path.join(output_folder, EXPORT_ROWS_FILE)
+
+    if (cache.get("source", {}).get("sha1") == source["sha1"] and cache.get("sheet") == sheet_choice
+            and cache.get("columns", 0) >= column_count and os.path.isfile(rows_path)):
+        if cache.get("params") == params_key and outputs_unchanged(cache.get("outputs"), output_files):
+            print("表格和参数都没有变化，跳过生成")
+            if cache["source"] != source:
+                # 只是修改时间变了，记下新的状态，下次不用再计算 sha1
+                cache["source"] = source
+                save_export_cache(output_folder, cache)
+            return
+        # 表格内容没有变化，直接使用缓存中解析好的行
+        outputs = process_excel_and_generate_txt(
+            chunks=read_row_chunks(iter_cached_rows(rows_path)), output_files=output_files, render=render)
+    else:
+        # 只读模式按行流式读取，不为整个工作簿建立单元格对象，内存占用不随表格大小增长
+        wb = openpyxl.load_workbook(selected_file, read_only=True, keep_links=False)
+        try:
+            # 列出表名并让用户选择
+            sheet_names = wb.sheetnames
+            selected_sheet = sheet_names[sheet_choice]
+            rows = iter_sheet_rows(wb[selected_sheet], openpyxl.utils.column_index_from_string("A"), column_count)
+            with open(rows_path + ".tmp", "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as rows_file:
+                outputs = process_excel_and_generate_txt(
+                    chunks=cache_row_chunks(read_row_chunks(rows), rows_file), output_files=output_files, render=render)
+        finally:
+            # 只读模式会一直占用文件句柄，用完需要关闭
+            wb.close()
+        # 导出失败时缓存的行可能不完整，不能保留
+        if outputs is not None:
+            os.replace(rows_path + ".tmp", rows_path)
+        else:
+            os.remove(rows_path + ".tmp")
+        cache = {"sheet": sheet_choice, "columns": column_count}
+
+    if outputs is not None:
+        cache.update(source=source, params=params_key, outputs=outputs)
+        save_export_cache(output_folder, cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
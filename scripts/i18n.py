@@ -1,7 +1,14 @@
+import hashlib
+import json
 import os
 import re
-from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from bs4 import BeautifulSoup, Tag
 from bs4 import Comment  # 修正注释检测
+from bs4.builder import HTMLTreeBuilder
+from bs4.element import DEFAULT_OUTPUT_ENCODING, CharsetMetaAttributeValue, ContentMetaAttributeValue
+from lxml import etree
 
 # 读取配置文件，格式为 key=value
 def load_config(config_file_path):
@@ -14,69 +21,319 @@ def load_config(config_file_path):
                 config[key.strip()] = value.strip()  # 存入字典
     return config
 
+# 建立 中文 -> key 的索引，每次运行只建一次
+# 同一个中文对应多个 key 时，文本和 placeholder 都使用配置文件中最先出现的 key，重复的记录在 duplicates 中
+def build_value_index(config):
+    value_index = {}
+    duplicates = {}
+    for key, value in config.items():
+        if value in value_index:
+            duplicates.setdefault(value, [value_index[value]]).append(key)
+        else:
+            value_index[value] = key
+    return value_index, duplicates
+
 # 读取 HTML 文件
 def read_html_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-# 替换 HTML 内容并添加 data-i18n-text 属性，仅处理 <body> 标签内的元素
-def replace_text_in_html(html_content, config, unmatched_texts, file_name):
+# 正则表达式匹配中文字符
+CHINESE_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fa5]+')
+
+# 内容不做替换的标签
+SKIPPED_TAGS = {"script", "style"}
+
+# 值为空时按布尔属性输出的属性
+BOOLEAN_ATTRIBUTES = {"selected", "checked", "disabled", "readonly", "multiple", "stoprepeatedclick"}
+
+# 匹配文本节点，返回 (key, 替换后的文本)；没有中文或没有匹配到时返回 None，未匹配的中文记录到 unmatched
+def match_text(string, value_index, unmatched):
+    text = string.strip().replace("&nbsp", "").replace("&nbsp;", "").replace(" ", "")  # 删除空格和&nbsp;
+    if not text or not CHINESE_CHAR_PATTERN.search(text):  # 检查是否有中文字符
+        return None
+    # 如果以中英文冒号结尾，仅匹配冒号之前的部分
+    is_colon_ended = text.endswith(':') or text.endswith('：')
+    compare_text = text[:-1] if is_colon_ended else text
+
+    key = value_index.get(compare_text)
+    if key is None:
+        unmatched.add(text)
+        return None
+    # 替换为新内容，保留冒号（如果有）
+    return key, text.replace(compare_text, "")
+
+# 匹配 placeholder 属性，返回 key；没有中文或没有匹配到时返回 None，未匹配的中文记录到 unmatched
+def match_placeholder(placeholder, value_index, unmatched):
+    if not CHINESE_CHAR_PATTERN.search(placeholder):
+        return None
+    key = value_index.get(placeholder)
+    if key is None:
+        unmatched.add(placeholder)
+    return key
+
+# 替换 HTML 内容并添加 data-i18n-text 属性
+# 一次遍历同时处理文本节点、placeholder 属性和布尔属性
+def replace_text_in_html(html_content, value_index, unmatched_texts, file_name):
     soup = BeautifulSoup(html_content, 'lxml')
+    unmatched = unmatched_texts[file_name]
+
+    stack = [soup]
+    while stack:
+        tag = stack.pop()
 
-    # 正则表达式匹配中文字符
-    chinese_char_pattern = re.compile(r'[\u4e00-\u9fa5]+')
-
-    # 遍历 <body> 标签内的所有文本节点
-    for element in soup.find_all(string=True):  # 使用 string 遍历所有文本节点
-
-        if element.parent.name in {"script", "style"}:
-            continue  # 忽略 <script> 和 <style> 中的内容
-        if isinstance(element, Comment):
-            continue  # 忽略注释
-
-        text = element.strip().replace("&nbsp", "").replace("&nbsp;", "").replace(" ", "")  # 删除空格和&nbsp;
-        if text:
-            match = chinese_char_pattern.search(text)  # 检查是否有中文字符
-            if match:
-                replaced = False
-                # 检查是否以中英文冒号结尾
-                is_colon_ended = text.endswith(':') or text.endswith('：')
-                # 如果以冒号结尾，仅匹配冒号之前的部分
-                compare_text = text[:-1] if is_colon_ended else text
-
-                for key, value in config.items():
-                    if value == compare_text:
-                        # 替换文本：移除标签中的中文，保留替换内容并添加属性
-                        parent = element.parent
-                        if parent is not None and parent.name != '[document]':
-                            # 替换为新内容，保留冒号（如果有）
-                            new_text = text.replace(value, "")
-                            parent['data-i18n-text'] = key
-                            element.replace_with(new_text)  # 更新文本节点
-                        replaced = True
-                if not replaced:  # 如果没有匹配到替换规则，则记录未匹配中文
-                    unmatched_texts[file_name].add(text)
-    
-    # 替换 placeholder 属性的中文内容
-    for element in soup.find_all(attrs={"placeholder": True}):  # 查找带有 placeholder 属性的标签
-        placeholder = element['placeholder']
-        if chinese_char_pattern.search(placeholder):  # 检查 placeholder 是否包含中文
-            replaced = False
-            for key, value in config.items():
-                if value == placeholder:
-                    element['data-i18n-placeholder'] = key  # 添加 data-i18n-placeholder 属性
-                    element['placeholder'] = ""  # 替换 placeholder 文本
-                    replaced = True
-            if not replaced:  # 如果未匹配到，记录未匹配的 placeholder 中文
-                unmatched_texts[file_name].add(placeholder)
-
-    for tag in soup.find_all(True):
-        for attr in ["selected", "checked", "disabled", "readonly", "multiple", "stoprepeatedclick"]:
-            if attr in tag.attrs and tag.attrs[attr] == "":
+        # 替换 placeholder 属性的中文内容
+        placeholder = tag.attrs.get('placeholder')
+        if placeholder is not None:
+            key = match_placeholder(placeholder, value_index, unmatched)
+            if key is not None:
+                tag['data-i18n-placeholder'] = key  # 添加 data-i18n-placeholder 属性
+                tag['placeholder'] = ""  # 替换 placeholder 文本
+
+        for attr in BOOLEAN_ATTRIBUTES:
+            if tag.attrs.get(attr) == "":
                 tag.attrs[attr] = None  # 移除值以保留布尔属性原样
-                
+
+        # 子节点中的标签放入栈中，文本节点直接替换
+        for child in list(tag.contents):
+            if isinstance(child, Tag):
+                stack.append(child)
+                continue
+            if tag.name in SKIPPED_TAGS or isinstance(child, Comment):
+                continue  # 忽略 <script>、<style> 中的内容和注释
+            matched = match_text(child, value_index, unmatched)
+            if matched and tag.name != '[document]':
+                key, new_text = matched
+                tag['data-i18n-text'] = key
+                child.replace_with(new_text)  # 更新文本节点
+
     return soup.decode(formatter=None)
 
+# 以下是 BeautifulSoup 的输出规则，lxml 后端按这些规则输出，结果与 decode(formatter=None) 逐字节一致
+EMPTY_ELEMENT_TAGS = HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS
+PRESERVE_WHITESPACE_TAGS = HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+NONWHITESPACE_PATTERN = re.compile(r'\S+')
+
+# 多值属性（如 class）会被拆开再用一个空格连接
+UNIVERSAL_LIST_ATTRIBUTES = set(HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES.get('*', []))
+LIST_ATTRIBUTES = {
+    tag: UNIVERSAL_LIST_ATTRIBUTES | set(attrs)
+    for tag, attrs in HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES.items()
+}
+
+# 根元素之前的部分：空白、注释、处理指令和一个 DOCTYPE，其中的空白 libxml2 会跳过
+# lxml 在没有 DOCTYPE 时会自动补一个，所以是否输出 DOCTYPE 以及它前面有几个注释要看源文件
+PROLOG_PATTERN = re.compile(
+    r'((?:[\x20\x0a\x09\x0c\x0d]+|<!--.*?-->|<\?[^>]*>)*)(<!doctype[^>]*>)?(?:[\x20\x0a\x09\x0c\x0d]+|<!--.*?-->|<\?[^>]*>)*',
+    re.IGNORECASE | re.DOTALL,
+)
+PROLOG_NODE_PATTERN = re.compile(r'<!--.*?-->|<\?[^>]*>', re.DOTALL)
+# 不在文档开头的 DOCTYPE 会被 libxml2 丢掉，BeautifulSoup 会保留
+DOCTYPE_PATTERN = re.compile(r'<!doctype', re.IGNORECASE)
+
+# 根元素关闭后的空白 BeautifulSoup 会保留在文档末尾，lxml 建树时会丢掉
+# 在末尾补一个标记注释：标记成为根元素的兄弟节点，说明 </html> 已经关闭了根元素，后面的空白需要补上
+TRAILING_PATTERN = re.compile(r'</html\s*>((?:\s|</[^<>]*>)*)\Z', re.IGNORECASE)
+CLOSING_TAG_PATTERN = re.compile(r'</[^<>]*>')
+END_MARKER = 'i18n-end-of-document'
+
+# libxml2 建树时把不带值的这些属性的值设为属性名（<td nowrap> 得到 nowrap="nowrap"），BeautifulSoup 得到的是空值
+# 源文件中没有显式写成 nowrap="nowrap" 时，值等于属性名就说明原来没有值；有显式写法时无法区分，交给 BeautifulSoup 处理
+LIBXML2_BOOLEAN_ATTRIBUTES = {
+    "checked", "compact", "declare", "defer", "disabled", "ismap", "multiple",
+    "nohref", "noresize", "noshade", "nowrap", "readonly", "selected",
+}
+EXPLICIT_BOOLEAN_PATTERN = re.compile(
+    r'\b(' + '|'.join(sorted(LIBXML2_BOOLEAN_ATTRIBUTES)) + r')\s*=\s*["\']?\s*\1\b', re.IGNORECASE
+)
+
+# 布尔属性在当前 BeautifulSoup 版本中的输出形式：旧版本输出 disabled，新版本输出 disabled=""
+def probe_boolean_attribute_suffix():
+    soup = BeautifulSoup('<p x="">', 'lxml')
+    soup.p.attrs['x'] = None
+    return soup.p.decode(formatter=None)[len('<p x'):-len('></p>')]
+
+BOOLEAN_ATTRIBUTE_SUFFIX = probe_boolean_attribute_suffix()
+
+# 不在 <pre>、<textarea> 中的纯空白文本，含换行的变为一个换行，否则变为一个空格
+def collapse_whitespace(text, preserve):
+    if preserve or text.strip(ASCII_SPACES):
+        return text
+    return '\n' if '\n' in text else ' '
+
+def quote_attribute_value(value):
+    if '"' not in value:
+        return '"' + value + '"'
+    if "'" not in value:
+        return "'" + value + "'"
+    return '"' + value.replace('"', '&quot;') + '"'
+
+# BeautifulSoup 输出时会把 <meta> 中声明的编码改为输出编码 utf-8
+def substitute_meta_charset(attributes):
+    if 'charset' in attributes:
+        attributes['charset'] = CharsetMetaAttributeValue(attributes['charset']).substitute_encoding(DEFAULT_OUTPUT_ENCODING)
+    elif 'content' in attributes and attributes.get('http-equiv', '').lower() == 'content-type':
+        attributes['content'] = ContentMetaAttributeValue(attributes['content']).substitute_encoding(DEFAULT_OUTPUT_ENCODING)
+
+def format_start_tag(element):
+    tag = element.tag
+    list_attributes = LIST_ATTRIBUTES.get(tag, UNIVERSAL_LIST_ATTRIBUTES)
+    attributes = dict(element.items())
+    if tag == 'meta':
+        substitute_meta_charset(attributes)
+    parts = ['<', tag]
+    for key, value in sorted(attributes.items()):
+        if key in LIBXML2_BOOLEAN_ATTRIBUTES and value == key:
+            value = ""
+        if key in list_attributes:
+            value = " ".join(NONWHITESPACE_PATTERN.findall(value))
+        elif value == "" and key in BOOLEAN_ATTRIBUTES:
+            parts.append(' ' + key + BOOLEAN_ATTRIBUTE_SUFFIX)
+            continue
+        parts.append(' ' + key + '=' + quote_attribute_value(value))
+    if len(element) == 0 and not element.text and tag in EMPTY_ELEMENT_TAGS:
+        parts.append('/>')
+    else:
+        parts.append('>')
+    return ''.join(parts)
+
+# 注释和处理指令（较新的 libxml2 会把 HTML 中的处理指令当作注释）
+def format_comment(element, preserve):
+    if element.tag is etree.PI:
+        return '<?' + collapse_whitespace(element.target + ' ' + (element.text or ''), preserve) + '>'
+    return '<!--' + collapse_whitespace(element.text or '', preserve) + '-->'
+
+def format_doctype(docinfo):
+    dtd = docinfo.internalDTD
+    value = dtd.name or ''
+    if dtd.external_id is not None:
+        value += ' PUBLIC "%s"' % dtd.external_id
+        if dtd.system_url is not None:
+            value += ' "%s"' % dtd.system_url
+    elif dtd.system_url is not None:
+        value += ' SYSTEM "%s"' % dtd.system_url
+    return '<!DOCTYPE ' + value + '>\n'
+
+# 用 lxml 解析，返回 (根元素, DOCTYPE 前面的注释数量, 根元素关闭后的空白)
+# DOCTYPE 不存在时数量为 -1；lxml 的结果和 BeautifulSoup 可能不一致时返回 None
+def parse_lxml_document(source):
+    prolog = PROLOG_PATTERN.match(source)
+    if source.startswith(('</', '<!'), prolog.end()):
+        return None  # 根元素之前有多余的结束标签或声明，之后的空白 BeautifulSoup 会保留
+    if DOCTYPE_PATTERN.search(source, prolog.end()):
+        return None  # 文档中间或末尾还有 DOCTYPE
+    doctype_index = len(PROLOG_NODE_PATTERN.findall(prolog.group(1))) if prolog.group(2) else -1
+
+    trailing = TRAILING_PATTERN.search(source)
+    trailing_spaces = CLOSING_TAG_PATTERN.sub('', trailing.group(1)) if trailing else ''
+
+    parser = etree.HTMLParser(recover=True)
+    try:
+        parser.feed(source + '<!--' + END_MARKER + '-->' if trailing_spaces else source)
+        root = parser.close()
+    except etree.XMLSyntaxError:
+        return None
+    if root is None or EXPLICIT_BOOLEAN_PATTERN.search(source):
+        return None
+
+    following = list(root.itersiblings())
+    if not trailing_spaces:
+        return (root, doctype_index, '') if not following else None
+    if following:
+        # 标记之外还有内容，或者 </html> 之后还有其它 </html>，无法确定丢掉的空白
+        if len(following) > 1 or following[0].text != END_MARKER or '</html' in trailing.group(1).lower():
+            return None
+        return root, doctype_index, trailing_spaces
+
+    # 根元素没有提前关闭，空白已经在树中，去掉树中最后的标记注释
+    last = root
+    while len(last):
+        last = last[-1]
+    if last.tag is not etree.Comment or last.text != END_MARKER:
+        return None
+    last.getparent().remove(last)
+    return root, doctype_index, ''
+
+# lxml 后端：直接在 lxml 元素上替换，一次遍历同时完成替换和输出，不建立 BeautifulSoup 对象
+# 开始标签在元素结束时才生成，这样子节点文本添加的 data-i18n-text 属性也会输出
+# lxml 的结果和 BeautifulSoup 可能不一致时交给 BeautifulSoup 处理
+def replace_text_in_html_lxml(html_content, value_index, unmatched_texts, file_name):
+    unmatched = unmatched_texts[file_name]
+    source = html_content[1:] if html_content.startswith('\ufeff') else html_content
+    document = parse_lxml_document(source)
+    if document is None:
+        return replace_text_in_html(html_content, value_index, unmatched_texts, file_name)
+    root, doctype_index, trailing_spaces = document
+
+    parts = []
+
+    # 根元素之前的注释和 DOCTYPE，按源文件中的顺序输出
+    leading = list(root.itersiblings(preceding=True))
+    leading.reverse()
+    docinfo = root.getroottree().docinfo
+    for index, element in enumerate(leading):
+        if index == doctype_index:
+            parts.append(format_doctype(docinfo))
+        parts.append(format_comment(element, 0))
+    if doctype_index >= len(leading):
+        parts.append(format_doctype(docinfo))
+    if doctype_index >= 0:
+        match_text(docinfo.internalDTD.name or '', value_index, unmatched)
+
+    open_tags = []  # 尚未生成的开始标签在 parts 中的位置
+    preserve = 0  # 当前所在的 <pre>、<textarea> 层数
+    for event, element in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            placeholder = element.get('placeholder')
+            if placeholder is not None:
+                key = match_placeholder(placeholder, value_index, unmatched)
+                if key is not None:
+                    element.set('data-i18n-placeholder', key)
+                    element.set('placeholder', "")
+            open_tags.append(len(parts))
+            parts.append(None)
+            if element.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve += 1
+            text = element.text
+            if text:
+                if element.tag not in SKIPPED_TAGS:
+                    matched = match_text(text, value_index, unmatched)
+                    if matched:
+                        key, text = matched
+                        element.set('data-i18n-text', key)
+                parts.append(collapse_whitespace(text, preserve) if text else text)
+            continue
+
+        if event == 'end':
+            parts[open_tags.pop()] = format_start_tag(element)
+            if len(element) or element.text or element.tag not in EMPTY_ELEMENT_TAGS:
+                parts.append('</' + element.tag + '>')
+            if element.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve -= 1
+        else:
+            parts.append(format_comment(element, preserve))
+
+        tail = element.tail
+        if tail:
+            parent = element.getparent()
+            if parent is not None and parent.tag not in SKIPPED_TAGS:
+                matched = match_text(tail, value_index, unmatched)
+                if matched:
+                    key, tail = matched
+                    parent.set('data-i18n-text', key)
+            parts.append(collapse_whitespace(tail, preserve) if tail else tail)
+
+    if trailing_spaces:
+        parts.append(collapse_whitespace(trailing_spaces, 0))
+    return ''.join(parts)
+
+# 可选的 HTML 处理后端
+HTML_BACKENDS = {
+    'bs4': replace_text_in_html,
+    'lxml': replace_text_in_html_lxml,
+}
+
 # 递归获取目录下所有的 .html 文件
 def get_html_files_from_directory(dir_path):
     html_files = []
@@ -91,57 +348,313 @@ def write_unmatched_to_markdown(unmatched_texts, output_path):
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write("# 未匹配中文字符\n\n")
         for file_name, texts in unmatched_texts.items():
-            if texts:
-                f.write(f"## 文件: {file_name}\n\n")
-                for text in texts:
-                    f.write(f"- {text}\n")
-                f.write("\n")
+            write_unmatched_section(f, file_name, texts)
 
-# 主函数
-def main():
-    config_file_path = 'output-cn-utf8.txt'  # 配置文件路径
-    html_files = get_html_files_from_directory('.\html')  # 获取当前目录及子目录中的所有 .html 文件
+# 逐个文件写出未匹配中文，不保存全部结果；同名文件需要相邻出现，合并为一个章节
+# results 为 (文件路径, 未匹配中文) 的迭代器
+def write_unmatched_to_markdown_stream(results, output_path):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("# 未匹配中文字符\n\n")
+        current_name, current_texts = None, set()
+        for html_file, unmatched in results:
+            file_name = os.path.basename(html_file)
+            if file_name != current_name:
+                write_unmatched_section(f, current_name, current_texts)
+                current_name, current_texts = file_name, set()
+            current_texts.update(unmatched)
+        write_unmatched_section(f, current_name, current_texts)
 
-    # 加载配置文件
-    config = load_config(config_file_path)
+def write_unmatched_section(f, file_name, texts):
+    if texts:
+        f.write(f"## 文件: {file_name}\n\n")
+        for text in sorted(texts):
+            f.write(f"- {text}\n")
+        f.write("\n")
+        f.flush()
 
-    # 创建输出目录
-    if not os.path.exists('updated'):
-        os.makedirs('updated')
+# 增量处理的缓存目录，放在输出目录中，每个源文件一个缓存文件，按需读写
+I18N_CACHE_DIR = '.i18n_cache'
+I18N_CACHE_VERSION = 2
 
-    # 创建字典存储未匹配的中文文本，按文件分类
-    unmatched_texts = {}
+# 记录处理一个文件时查询过的中文和查到的 key（未匹配为 None）
+# 输出只取决于源文件内容和这些查询结果，key 表变化后查询结果都不变的文件不需要重新生成
+class RecordingIndex:
+    def __init__(self, value_index):
+        self.value_index = value_index
+        self.lookups = {}
+
+    def get(self, text):
+        key = self.value_index.get(text)
+        self.lookups[text] = key
+        return key
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+# 缓存文件名取源文件相对路径的 sha1
+def cache_entry_path(cache_dir, relative_path):
+    return os.path.join(cache_dir, hashlib.sha1(relative_path.encode('utf-8')).hexdigest() + '.json')
+
+# 缓存格式: {version, source: 源文件相对路径, sha1, key_table: key 表文件的 sha1, output, output_stat, unmatched, lookups}
+def load_cache_entry(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('version') == I18N_CACHE_VERSION:
+            return entry
+    except (OSError, ValueError):
+        pass
+    return None
+
+def save_cache_entry(path, entry):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+# 缓存的结果能否直接使用：源文件内容相同，输出文件没有被改动，key 表变化时查询结果也都相同
+# get_value_index 在 key 表变化时才调用，返回新的 中文 -> key 索引
+def cache_entry_valid(entry, relative_path, sha1, key_table, get_value_index):
+    if not entry or entry['source'] != relative_path or entry['sha1'] != sha1 or not os.path.isfile(entry['output']):
+        return False
+    stat = os.stat(entry['output'])
+    if entry['output_stat'] != [stat.st_size, stat.st_mtime_ns]:
+        return False
+    if entry['key_table'] != key_table:
+        value_index = get_value_index()
+        return all(value_index.get(text) == key for text, key in entry['lookups'].items())
+    return True
+
+# 工作进程中的 中文 -> key 索引，由 init_worker 在每个进程启动时加载一次
+_value_index = None
+
+def init_worker(config_file_path):
+    global _value_index
+    _value_index, _ = build_value_index(load_config(config_file_path))
+
+# 处理单个 HTML 文件，按相对 input_dir 的路径写入输出目录，返回 (文件路径, 输出路径, 未匹配中文, 查询过的中文及结果)
+def process_html_file(html_file, input_dir, output_dir, backend='bs4'):
+    # 读取原始 HTML 内容
+    html_content = read_html_file(html_file)
+
+    # 初始化当前文件的未匹配集合
+    file_name = os.path.basename(html_file)
+    unmatched_texts = {file_name: set()}
+
+    # 替换文本并添加 data-i18n-text 属性，仅处理 <body> 内的内容
+    value_index = RecordingIndex(_value_index)
+    updated_html = HTML_BACKENDS[backend](html_content, value_index, unmatched_texts, file_name)
+
+    # 保存更新后的文件到输出目录
+    relative_path = os.path.relpath(html_file, start=input_dir)
+    output_file_path = os.path.join(output_dir, relative_path)
+
+    # 确保输出目录存在
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+
+    # 写入更新后的 HTML 内容
+    with open(output_file_path, 'w', encoding='utf-8') as f:
+        f.write(updated_html)
+
+    return html_file, output_file_path, unmatched_texts[file_name], value_index.lookups
+
+# 默认的进度输出：每处理完一个文件打印一行，跳过的文件 output_file_path 为 None
+def print_progress(done, total, html_file, output_file_path, unmatched):
+    if output_file_path is None:
+        return
+    print(f"[{done}/{total}] 已保存更新后的文件: {output_file_path}，未匹配中文 {len(unmatched)} 条")
 
-    # 处理每个 HTML 文件
-    for html_file in html_files:
-        print(f"正在处理文件: {html_file}")
-        
-        # 读取原始 HTML 内容
-        html_content = read_html_file(html_file)
+# 逐个处理 HTML 文件，每处理完一个文件返回一次 (文件路径, 未匹配中文)，并调用一次 progress
+# workers 大于 1 时分给多个进程并行处理
+# window 为 None 时一次提交全部文件，按完成顺序返回；否则最多同时处理 window 个文件，按 html_files 的顺序返回，
+# 已返回的结果不再保留，内存占用与文件数量无关
+# 指定 cache_dir 时，源文件和相关的 key 都没有变化的文件直接使用上次的结果，不再重新生成
+def iter_html_results(html_files, config_file_path, input_dir, output_dir, workers=1, progress=print_progress,
+                      backend='bs4', cache_dir=None, window=None):
+    key_table = file_sha1(config_file_path)
+    value_index = []
 
-        # 初始化当前文件的未匹配集合
-        file_name = os.path.basename(html_file)
-        unmatched_texts[file_name] = set()
+    # key 表变化时才需要在主进程中建立索引，检查缓存的查询结果
+    def get_value_index():
+        if not value_index:
+            value_index.append(build_value_index(load_config(config_file_path))[0])
+        return value_index[0]
 
-        # 替换文本并添加 data-i18n-text 属性，仅处理 <body> 内的内容
-        updated_html = replace_text_in_html(html_content, config, unmatched_texts, file_name)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
 
-        # 保存更新后的文件到 updated 目录
-        relative_path = os.path.relpath(html_file, start='.')
-        output_file_path = os.path.join('updated', relative_path)
-        
-        # 确保输出目录存在
-        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    # 检查缓存，可以复用的文件返回缓存的未匹配中文，否则返回需要处理的参数
+    def plan(html_file):
+        relative_path = os.path.relpath(html_file, start=input_dir)
+        if not cache_dir:
+            return None, None, relative_path, None
+        sha1 = file_sha1(html_file)
+        entry_path = cache_entry_path(cache_dir, relative_path)
+        entry = load_cache_entry(entry_path)
+        if not cache_entry_valid(entry, relative_path, sha1, key_table, get_value_index):
+            return None, entry_path, relative_path, sha1
+        if entry['key_table'] != key_table:
+            entry['key_table'] = key_table
+            save_cache_entry(entry_path, entry)
+        return set(entry['unmatched']), entry_path, relative_path, sha1
 
-        # 写入更新后的 HTML 内容
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            f.write(updated_html)
+    # 处理完一个文件后更新缓存，只返回未匹配中文
+    def finish(result, entry_path, relative_path, sha1):
+        html_file, output_file_path, unmatched, lookups = result
+        if entry_path:
+            stat = os.stat(output_file_path)
+            save_cache_entry(entry_path, {
+                'version': I18N_CACHE_VERSION,
+                'source': relative_path,
+                'sha1': sha1,
+                'key_table': key_table,
+                'output': output_file_path,
+                'output_stat': [stat.st_size, stat.st_mtime_ns],
+                'unmatched': sorted(unmatched),
+                'lookups': lookups,
+            })
+        return html_file, output_file_path, unmatched
 
-        print(f"已保存更新后的文件: {output_file_path}")
+    total = len(html_files)
+    done = 0
+    skipped = 0
+
+    def report(html_file, output_file_path, unmatched):
+        nonlocal done
+        done += 1
+        progress(done, total, html_file, output_file_path, unmatched)
+        return html_file, unmatched
+
+    executor = None
+    if workers > 1 and total > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config_file_path,))
+    else:
+        init_worker(config_file_path)
+    try:
+        pending = deque()  # (html_file, 缓存的未匹配中文或 Future, 缓存参数)
+
+        # 取出队首的结果；window 模式下队首可能是缓存的结果
+        def pop_result():
+            html_file, item, entry_args = pending.popleft()
+            if isinstance(item, Future):
+                return report(*finish(item.result(), *entry_args))
+            return report(html_file, None, item)
+
+        for html_file in html_files:
+            cached, *entry_args = plan(html_file)
+            if cached is not None:
+                skipped += 1
+                if window is None:
+                    yield report(html_file, None, cached)
+                else:
+                    pending.append((html_file, cached, entry_args))
+            elif executor is None:
+                yield report(*finish(process_html_file(html_file, input_dir, output_dir, backend), *entry_args))
+            else:
+                future = executor.submit(process_html_file, html_file, input_dir, output_dir, backend)
+                pending.append((html_file, future, entry_args))
+
+            # 按顺序返回已经完成的结果，同时处理的文件超过 window 个时等待最早的一个
+            while window is not None and pending and (
+                len(pending) > window or not isinstance(pending[0][1], Future) or pending[0][1].done()
+            ):
+                yield pop_result()
+
+        if window is None:
+            futures = {item: entry_args for _, item, entry_args in pending}
+            pending.clear()
+            for future in as_completed(futures):
+                yield report(*finish(future.result(), *futures.pop(future)))
+        while pending:
+            yield pop_result()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if cache_dir and skipped:
+        print(f"{skipped} 个文件和相关的 key 都没有变化，跳过")
+
+# 删除已经不存在的源文件的缓存
+def remove_stale_cache_entries(cache_dir, html_files, input_dir):
+    if not os.path.isdir(cache_dir):
+        return
+    expected = {os.path.basename(cache_entry_path(cache_dir, os.path.relpath(html_file, start=input_dir))) for html_file in html_files}
+    for name in os.listdir(cache_dir):
+        if name not in expected:
+            os.remove(os.path.join(cache_dir, name))
+
+# 处理所有 HTML 文件，返回按文件名分类的未匹配中文，按文件路径顺序合并，结果与进程数和完成顺序无关
+def process_html_files(html_files, config_file_path, input_dir, output_dir, workers=1, progress=print_progress,
+                       backend='bs4', cache_dir=None):
+    results = dict(iter_html_results(html_files, config_file_path, input_dir, output_dir, workers, progress, backend, cache_dir))
+
+    # 不同目录下的同名文件，未匹配中文合并在一起
+    unmatched_texts = {}
+    for html_file in sorted(results):
+        unmatched_texts.setdefault(os.path.basename(html_file), set()).update(results[html_file])
+    return unmatched_texts
+
+DEFAULT_INPUT_FOLDER = '.\\html'
+DEFAULT_KEY_FILE = 'output-cn-utf8.txt'
+DEFAULT_OUTPUT_FOLDER = 'updated'
+DEFAULT_UNMATCHED_FILE = 'unmatched.md'
+DEFAULT_BACKEND = 'lxml'
+
+# 主函数
+# input_folder: HTML 目录，key_file: key=value 格式的配置文件，output_folder: 输出目录
+# unmatched_file: 未匹配中文的 Markdown 文件，默认在输出目录下
+# backend: bs4 或 lxml，两者输出相同，lxml 更快
+# low_memory: 是 时按文件名顺序逐个处理并写出未匹配中文，不保留全部文件的结果
+def main(input_folder="", key_file="", output_folder="", unmatched_file="", workers="", backend="", use_cache="是",
+         low_memory="否"):
+    input_folder = input_folder or DEFAULT_INPUT_FOLDER
+    config_file_path = key_file or DEFAULT_KEY_FILE
+    output_folder = output_folder or DEFAULT_OUTPUT_FOLDER
+    unmatched_md_path = unmatched_file or os.path.join(output_folder, DEFAULT_UNMATCHED_FILE)
+    workers = int(workers) if workers else os.cpu_count() or 1
+    backend = backend or DEFAULT_BACKEND
+    if backend not in HTML_BACKENDS:
+        raise ValueError(f"不支持的处理后端: {backend}，可选 {', '.join(HTML_BACKENDS)}")
+    if not os.path.isdir(input_folder):
+        raise ValueError(f"HTML 目录不存在: {input_folder}")
+    if not os.path.isfile(config_file_path):
+        raise ValueError(f"key 配置文件不存在: {config_file_path}")
+
+    # 获取 HTML 目录及子目录中的所有 .html 文件，输出目录在 HTML 目录中时跳过输出目录
+    output_root = os.path.abspath(output_folder) + os.sep
+    html_files = [
+        html_file for html_file in get_html_files_from_directory(input_folder)
+        if not os.path.abspath(html_file).startswith(output_root)
+    ]
+    print(f"共 {len(html_files)} 个 HTML 文件")
+
+    # 加载配置文件，检查一个中文对应多个 key 的情况
+    config = load_config(config_file_path)
+    _, duplicates = build_value_index(config)
+    for value, keys in duplicates.items():
+        print(f"警告: \"{value}\" 对应多个 key {', '.join(keys)}，使用 {keys[0]}")
+
+    # 创建输出目录
+    os.makedirs(output_folder, exist_ok=True)
+    cache_dir = os.path.join(output_folder, I18N_CACHE_DIR) if use_cache != "否" else None
 
-    # 将未匹配字符输出到 Markdown 文件
-    unmatched_md_path = 'unmatched.md'
-    write_unmatched_to_markdown(unmatched_texts, unmatched_md_path)
+    if low_memory == "是":
+        # 同名文件相邻处理，未匹配中文逐个文件写出
+        html_files.sort(key=lambda html_file: (os.path.basename(html_file), html_file))
+        results = iter_html_results(html_files, config_file_path, input_folder, output_folder, workers,
+                                    backend=backend, cache_dir=cache_dir, window=workers * 2)
+        write_unmatched_to_markdown_stream(results, unmatched_md_path)
+    else:
+        # 处理每个 HTML 文件，得到按文件分类的未匹配中文
+        unmatched_texts = process_html_files(html_files, config_file_path, input_folder, output_folder, workers,
+                                             backend=backend, cache_dir=cache_dir)
+        # 将未匹配字符输出到 Markdown 文件
+        write_unmatched_to_markdown(unmatched_texts, unmatched_md_path)
+    if cache_dir:
+        remove_stale_cache_entries(cache_dir, html_files, input_folder)
     print(f"未匹配的中文字符已保存到: {unmatched_md_path}")
 
     print("\n处理完成。")
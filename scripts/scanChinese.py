@@ -1,50 +1,496 @@
+import fnmatch
+import hashlib
+import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import accumulate, compress, repeat
+from operator import attrgetter, itemgetter, methodcaller, sub
 
-def extract_chinese_text(directory):
+# File extensions to process; markup files are scanned as HTML with code only inside <script> and <style>
+FILE_EXTENSIONS = {'.html', '.js', '.vue', '.ts'}
+MARKUP_EXTENSIONS = {'.html', '.vue'}
+
+# Defaults for the directories and file patterns skipped during traversal, and the file size cap in KB
+DEFAULT_IGNORE_DIRS = 'node_modules,dist,.git'
+DEFAULT_IGNORE_PATTERNS = '*.min.js'
+DEFAULT_MAX_FILE_SIZE = 1024
+
+# A file whose first MINIFIED_SAMPLE_SIZE characters average more than MINIFIED_LINE_LENGTH per line is treated as minified
+MINIFIED_SAMPLE_SIZE = 8192
+MINIFIED_LINE_LENGTH = 500
+CHINESE_TEXT_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+
+# The last word before a slash; a slash after one of these keywords starts a regex, not a division
+PREVIOUS_WORD_PATTERN = re.compile(r'([\w$]+)\s*$')
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+# The body of a string literal up to its closing quote, the end of the line or the first Chinese
+# character, and the rest of a string literal with or without Chinese
+STRING_BODY = r"[^%(quote)s\\\n\u4e00-\u9fff]*(?:\\[^\u4e00-\u9fff][^%(quote)s\\\n\u4e00-\u9fff]*)*"
+STRING_REST = r"[^%(quote)s\\\n]*(?:\\.[^%(quote)s\\\n]*)*"
+
+# A template literal whose ${...} expressions are plain code without strings, braces, slashes or
+# nested templates, e.g. `共${total}条`; its text and expressions are scanned as one piece. The
+# second form has no Chinese.
+TEMPLATE_LITERAL = r"`[^`\\$]*(?:(?:\\.|\$(?!\{)|\$\{(?:[^{}`'\"/<]|<(?!!--))*\})[^`\\$]*)*`"
+PLAIN_TEMPLATE_LITERAL = (r"`[^`\\$\u4e00-\u9fff]*(?:(?:\\[^\u4e00-\u9fff]|\$(?!\{)"
+                          r"|\$\{(?:[^{}`'\"/<\u4e00-\u9fff]|<(?!!--))*\})[^`\\$\u4e00-\u9fff]*)*`")
+
+# A slash that regex_allowed would take for a division or the start of a regex literal, judged by
+# the character before it or before one space. Other slashes, e.g. after a keyword such as return,
+# are left to regex_allowed.
+DIVISION_SLASH = (r"/(?![/*])(?:(?<=[\w$)\]}\"'`<]/)|(?<=[\w$)\]}\"'`<]\s/))"
+                  + "".join(r"(?<!%s/)(?<!%s\s/)" % (keyword, keyword) for keyword in sorted(REGEX_KEYWORDS)))
+REGEX_SLASH = r"/(?![/*])(?:(?<=[(,=:\[!&|?{};]/)|(?<=[(,=:\[!&|?{};]\s/))"
+PLAIN_REGEX_LITERAL = (r"(?:[^/\\\[\n\u4e00-\u9fff]|\\[^\n\u4e00-\u9fff]"
+                       r"|\[(?:[^\]\\\n\u4e00-\u9fff]|\\[^\n\u4e00-\u9fff])*\])+/[A-Za-z]*")
+
+# Finds the next Chinese run in one regex call. It skips plain code, comments, divisions and strings,
+# template and regex literals without Chinese, then matches Chinese text in code or the string
+# literal it is in (group run holds the first run of the string, group more the rest of the string
+# when that has more Chinese), or a template literal with Chinese (group template). Everything else
+# that needs the scanner loop stops the skip and is matched by group stop: a template literal with
+# nested code, a slash regex_allowed has to decide, a regex literal with Chinese, an unterminated
+# string and (inside a ${...} expression) a brace. The stop group also matches any other character,
+# so the pattern never backtracks into the skip, and the match runs to the end so finditer ends there.
+TOKEN_PATTERN = r"""
+    (?:
+        [^<"'`/%(braces)s\u4e00-\u9fff]+
+      | <(?!!--)
+      | <!--[^-]*(?:-(?!->)[^-]*)*(?:-->|\Z)
+      | /\*[^*]*(?:\*+[^*/][^*]*)*(?:\*+/|\**\Z)
+      | //[^\n]*
+      | "%(double)s"
+      | '%(single)s'
+      | %(plain_template)s
+      | %(division)s
+      | %(regex)s%(plain_regex)s
+    )*
+    (?:
+        (?P<quote>(?P<double>")%(double)s\\?|'%(single)s\\?)?
+        (?P<run>[\u4e00-\u9fff]+)
+        (?(quote)
+            (?: (?(double)%(double)s(?:"|(?=\n)|\Z)|%(single)s(?:'|(?=\n)|\Z))
+              | (?P<more>(?(double)%(double_rest)s"?|%(single_rest)s'?))
+            )
+        )
+      | (?P<template>%(template)s)
+      | (?P<stop>.|\Z).*
+    )
+"""
+TOKEN_PARTS = {
+    'double': STRING_BODY % {'quote': '"'}, 'single': STRING_BODY % {'quote': "'"},
+    'double_rest': STRING_REST % {'quote': '"'}, 'single_rest': STRING_REST % {'quote': "'"},
+    'template': TEMPLATE_LITERAL, 'plain_template': PLAIN_TEMPLATE_LITERAL,
+    'division': DIVISION_SLASH, 'regex': REGEX_SLASH, 'plain_regex': PLAIN_REGEX_LITERAL,
+}
+CODE_TOKEN_PATTERN = re.compile(TOKEN_PATTERN % dict(TOKEN_PARTS, braces=''), re.DOTALL | re.VERBOSE)
+EXPRESSION_TOKEN_PATTERN = re.compile(TOKEN_PATTERN % dict(TOKEN_PARTS, braces='{}'), re.DOTALL | re.VERBOSE)
+
+# A string literal; an unterminated one ends at the end of the line
+STRING_PATTERN = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"?|\'[^\'\\\n]*(?:\\.[^\'\\\n]*)*\'?', re.DOTALL)
+
+# Text of a template literal up to its closing backtick or the next ${
+TEMPLATE_TEXT_PATTERN = re.compile(r'[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*', re.DOTALL)
+
+# A regex literal starting at a slash, e.g. /https?:\/\//g or /[\/"']/
+REGEX_LITERAL_PATTERN = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+
+# The attributes of a tag up to its closing >, and the same without Chinese
+TAG_BODY = r"""[^>"'%(chinese)s]*(?:(?:"[^"%(chinese)s]*"|'[^'%(chinese)s]*')[^>"'%(chinese)s]*)*"""
+
+# Skips markup text, <!-- --> comments and tags without Chinese, then matches Chinese text or the tag
+# it is in (group run holds the first run, group more the rest of the tag when that has more Chinese),
+# or stops (group stop) at the start tag of <script> or <style> and an unterminated tag. Quotes and
+# slashes in markup text are plain characters, so an apostrophe in "Don't" does not start a string.
+MARKUP_TOKEN_PATTERN = re.compile(r"""
+    (?:
+        [^<\u4e00-\u9fff]+
+      | <!--[^-]*(?:-(?!->)[^-]*)*(?:-->|\Z)
+      | <(?!(?i:script|style)\b)[/!]?%(plain_tag)s>
+      | <(?![A-Za-z/!])
+    )*
+    (?:
+        (?P<tag><(?!(?i:script|style)\b)[/!]?%(plain_tag)s(?:(?P<double>")[^"\u4e00-\u9fff]*|(?P<single>')[^'\u4e00-\u9fff]*)?)?
+        (?P<run>[\u4e00-\u9fff]+)
+        (?(tag)
+            (?: (?(double)[^"\u4e00-\u9fff]*")(?(single)[^'\u4e00-\u9fff]*')%(plain_tag)s>
+              | (?P<more>(?(double)[^"]*")(?(single)[^']*')%(tag)s>)
+            )
+        )
+      | (?P<stop>.|\Z).*
+    )
+""" % {'plain_tag': TAG_BODY % {'chinese': r'\u4e00-\u9fff'}, 'tag': TAG_BODY % {'chinese': ''}}, re.DOTALL | re.VERBOSE)
+
+# Read the first Chinese run and the kind of a token match, and the kinds whose match can hold more runs
+RUN_TEXT = itemgetter('run')
+RUN_START = methodcaller('start', 'run')
+LAST_GROUP = attrgetter('lastgroup')
+SPAN_KINDS = {'more', 'template'}
+
+# A tag with its attributes; quotes only delimit strings here. An unterminated quote ends the tag.
+TAG_PATTERN = re.compile(r'<[/!]?([A-Za-z][\w:-]*)?(?:[^>"\']+|"[^"]*"|\'[^\']*\')*>?')
+
+# Tags whose content is code, up to the matching end tag
+CODE_TAGS = {'script', 'style'}
+CODE_END_PATTERNS = {name: re.compile(r'</%s' % name, re.IGNORECASE) for name in CODE_TAGS}
+
+# Number of files handed to a worker process at a time
+CHUNK_SIZE = 64
+
+# Per-file scan results kept next to extracted_chinese_text.md; bump the version when the scanner changes
+SCAN_CACHE_FILE = 'extracted_chinese_text.cache.json'
+SCAN_CACHE_VERSION = 3
+
+def regex_allowed(content, pos):
+    """Whether a slash at pos starts a regex literal, judged by the last non-space character before it."""
+    i = pos - 1
+    while i >= 0 and content[i].isspace():
+        i -= 1
+    if i < 0:
+        return True
+    char = content[i]
+    if char in ')]}"\'`<':  # after < it is an end tag such as </div>
+        return False
+    if char.isalnum() or char in '_$':
+        match = PREVIOUS_WORD_PATTERN.search(content, max(0, i - 15), i + 1)
+        return bool(match) and match.group(1) in REGEX_KEYWORDS
+    return True
+
+def iter_chinese_text(content, markup=False):
     """
-    Scan the specified directory and extract non-comment Chinese text from HTML, JS, VUE, and TS files.
+    Scan JS/TS/Vue/HTML source in a single pass and yield Chinese text outside comments.
 
-    :param directory: The directory to scan.
-    :return: A dictionary where keys are file paths and values are lists of Chinese text strings.
+    Strings, template literals (including nested ${...} expressions) and regex literals are
+    tracked, so comment markers inside them, such as the // in 'http://', are not treated as comments.
+
+    :param content: The source text.
+    :param markup: Scan the content as HTML: only <!-- --> comments count outside <script> and <style>,
+                   and quotes delimit strings only in attribute values.
+    :return: An iterator of (text, line, column) tuples, with 1-based line and column numbers.
+    """
+    found = []  # (start, text) of each Chinese run, in any order
+
+    def add_chinese(start, stop):
+        found.extend((match.start(), match.group()) for match in CHINESE_TEXT_PATTERN.finditer(content, start, stop))
+
+    def add_tokens(pattern, pos, end):
+        """Add the Chinese runs a token pattern finds from pos and return where it stopped."""
+        matches = list(pattern.finditer(content, pos, end))
+        runs = list(map(RUN_TEXT, matches))
+        found.extend(zip(map(RUN_START, compress(matches, runs)), filter(None, runs)))
+        kinds = list(map(LAST_GROUP, matches))
+        # strings, tags and template literals with more than one Chinese run
+        for match in compress(matches, map(SPAN_KINDS.__contains__, kinds)):
+            add_chinese(match.start(match.lastgroup), match.end())
+        return matches[kinds.index('stop')].start('stop')
+
+    def add_code(pos, end):
+        templates = []  # brace depth at which each open ${...} expression returns to its template literal
+        depth = 0
+        while pos < end:
+            pos = add_tokens(EXPRESSION_TOKEN_PATTERN if templates else CODE_TOKEN_PATTERN, pos, end)
+            if pos >= end:
+                break
+            char = content[pos]
+            if char == '"' or char == "'":
+                match = STRING_PATTERN.match(content, pos, end)
+                add_chinese(pos, match.end())
+                pos = match.end()
+            elif char == '/':
+                match = REGEX_LITERAL_PATTERN.match(content, pos, end) if regex_allowed(content, pos) else None
+                if match:
+                    add_chinese(pos, match.end())
+                    pos = match.end()
+                else:
+                    pos += 1
+            elif char == '{':
+                depth += 1
+                pos += 1
+            elif char == '}' and depth - 1 != templates[-1]:
+                depth -= 1
+                pos += 1
+            else:
+                # a backtick, or the } closing a ${...} expression: template text up to the closing backtick or the next ${
+                if char == '}':
+                    depth -= 1
+                    templates.pop()
+                text_end = TEMPLATE_TEXT_PATTERN.match(content, pos + 1, end).end()
+                add_chinese(pos + 1, text_end)
+                if content.startswith('${', text_end, end):
+                    templates.append(depth)
+                    depth += 1
+                    pos = text_end + 2
+                else:
+                    pos = text_end + 1  # skip the closing backtick
+
+    pos, end = 0, len(content)
+    if not markup:
+        add_code(pos, end)
+    while markup and pos < end:
+        pos = add_tokens(MARKUP_TOKEN_PATTERN, pos, end)
+        if pos >= end:
+            break
+        tag = TAG_PATTERN.match(content, pos)
+        add_chinese(pos, tag.end())
+        pos = tag.end()
+        name = (tag.group(1) or '').lower()
+        if name in CODE_TAGS and not tag.group().startswith('</') and not tag.group().endswith('/>'):
+            close = CODE_END_PATTERNS[name].search(content, pos)
+            code_end = close.start() if close else end
+            add_code(pos, code_end)
+            pos = code_end
+
+    if not found:
+        return iter(())
+    # line and column of every run in one pass: newlines between consecutive runs, and the last newline before each
+    found.sort()
+    starts, texts = zip(*found)
+    lines = accumulate(map(content.count, repeat('\n'), (0,) + starts[:-1], starts), initial=1)
+    next(lines)
+    columns = map(sub, starts, map(content.rfind, repeat('\n'), repeat(0), starts))
+    return zip(texts, lines, columns)
+
+def scan_file(file_path, with_hash=False):
+    """
+    Extract non-comment Chinese text from a single file.
+
+    :param file_path: The file to scan.
+    :param with_hash: Also return the SHA-1 of the file content.
+    :return: A list of (text, line, column) tuples, the SHA-1 (None unless with_hash is set),
+             and whether the file was skipped as minified.
     """
-    # File extensions to process
-    file_extensions = ['.html', '.js', '.vue', '.ts']
-    chinese_text_pattern = re.compile(r'[\u4e00-\u9fff]+')
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    sha1 = hashlib.sha1(data).hexdigest() if with_hash else None
+    content = data.decode('utf-8', errors='ignore')
+    if is_minified(content):
+        return [], sha1, True
+    return list(iter_chinese_text(content, os.path.splitext(file_path)[1] in MARKUP_EXTENSIONS)), sha1, False
+
+def scan_files(file_paths, with_hash=False):
+    """Scan a chunk of files in a worker process and return (file_path, matches, sha1, minified) tuples."""
+    return [(file_path, *scan_file(file_path, with_hash)) for file_path in file_paths]
+
+def is_minified(content):
+    sample = content[:MINIFIED_SAMPLE_SIZE]
+    return len(sample) > MINIFIED_LINE_LENGTH and len(sample) / (sample.count('\n') + 1) > MINIFIED_LINE_LENGTH
 
-    # Patterns for comments
-    single_line_comment = re.compile(r'//.*')
-    multi_line_comment = re.compile(r'/\*.*?\*/', re.DOTALL)
-    html_comment = re.compile(r'<!--.*?-->', re.DOTALL)
+def file_sha1(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
-    extracted_text = {}
+def load_scan_cache(cache_file):
+    """Load the scan cache, or an empty one if it is missing, unreadable or from another scanner version."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == SCAN_CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'version': SCAN_CACHE_VERSION, 'directories': {}}
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if any(file.endswith(ext) for ext in file_extensions):
-                file_path = os.path.join(root, file)
+def save_scan_cache(cache_file, cache):
+    with open(cache_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(cache_file + '.tmp', cache_file)
 
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+def glob_to_regex(pattern):
+    """Translate a .gitignore glob into a regex: * and ? stop at /, ** crosses directories."""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            regex += '[' + pattern[i + 1:end].replace('!', '^', 1 if pattern[i + 1] == '!' else 0) + ']'
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r'\Z')
 
-                # Remove comments
-                content = re.sub(html_comment, '', content)
-                content = re.sub(multi_line_comment, '', content)
-                content = re.sub(single_line_comment, '', content)
+def read_gitignore(directory):
+    """
+    Parse the .gitignore in a directory.
 
-                # Extract Chinese text
-                matches = chinese_text_pattern.findall(content)
+    :return: A list of (regex, negate, dir_only, anchored) rules. Anchored rules match the path relative
+             to the directory, the others match the file name only.
+    """
+    rules = []
+    try:
+        with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line
+        rules.append((glob_to_regex(line.lstrip('/')), negate, dir_only, anchored))
+    return rules
 
-                if matches:
-                    extracted_text[file_path] = matches
+def gitignored(gitignores, path, name, is_dir):
+    """Check a path against the .gitignore rules of its parent directories; the last matching rule wins."""
+    ignored = False
+    for base, rules in gitignores:
+        relative = path[len(os.path.join(base, '')):].replace(os.sep, '/')
+        for regex, negate, dir_only, anchored in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative if anchored else name):
+                ignored = not negate
+    return ignored
 
-    return extracted_text
+def list_files(directory, ignore_dirs=(), ignore_patterns=(), use_gitignore=False, max_file_size=0):
+    """
+    Return the files to scan under the directory, sorted by path.
 
-def main(input_folder=None):
-    result = extract_chinese_text(input_folder)
+    Ignored directories are pruned before descending into them.
+
+    :param directory: The directory to scan.
+    :param ignore_dirs: Directory names to skip, e.g. node_modules.
+    :param ignore_patterns: Glob patterns matched against file and directory names and their paths relative to directory.
+    :param use_gitignore: Also skip what the .gitignore files under the directory ignore.
+    :param max_file_size: Skip files larger than this many bytes; 0 means no limit.
+    :return: A list of (file_path, stat) pairs, and the number of files skipped for size.
+    """
+    ignore_dirs = set(ignore_dirs)
+    ignore_pattern = re.compile('|'.join(fnmatch.translate(pattern) for pattern in ignore_patterns)) if ignore_patterns else None
+    prefix_length = len(os.path.join(directory, ''))
+    files = []
+    too_large = 0
+    stack = [(directory, [])]
+    while stack:
+        current, gitignores = stack.pop()
+        if use_gitignore:
+            rules = read_gitignore(current)
+            if rules:
+                gitignores = gitignores + [(current, rules)]
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and entry.name in ignore_dirs:
+                continue
+            if not is_dir and os.path.splitext(entry.name)[1] not in FILE_EXTENSIONS:
+                continue
+            if ignore_pattern and (ignore_pattern.match(entry.name)
+                                   or ignore_pattern.match(entry.path[prefix_length:].replace(os.sep, '/'))):
+                continue
+            if gitignores and gitignored(gitignores, entry.path, entry.name, is_dir):
+                continue
+            if is_dir:
+                stack.append((entry.path, gitignores))
+            elif entry.is_file():
+                stat = entry.stat()
+                if max_file_size and stat.st_size > max_file_size:
+                    too_large += 1
+                else:
+                    files.append((entry.path, stat))
+    files.sort(key=lambda item: item[0])
+    return files, too_large
+
+def extract_chinese_text(directory, workers=1, cache_file=None, use_hash=False, ignore_dirs=(), ignore_patterns=(),
+                         use_gitignore=False, max_file_size=0):
+    """
+    Scan the specified directory and extract non-comment Chinese text from HTML, JS, VUE, and TS files.
+
+    :param directory: The directory to scan.
+    :param workers: Number of worker processes. Files are scanned in the current process when it is 1.
+    :param cache_file: Scan cache to reuse results from. Only files whose size or mtime changed are rescanned,
+                       and entries for files that no longer exist are dropped.
+    :param use_hash: Also keep a SHA-1 per file, so a file whose mtime changed but whose content did not
+                     (e.g. after a git checkout) is not rescanned.
+    :param ignore_dirs, ignore_patterns, use_gitignore, max_file_size: See list_files.
+    :return: A dictionary where keys are file paths and values are lists of (text, line, column) tuples,
+             ordered by file path.
+    """
+    files, too_large = list_files(directory, ignore_dirs, ignore_patterns, use_gitignore, max_file_size)
+
+    cache = load_scan_cache(cache_file) if cache_file else {'version': SCAN_CACHE_VERSION, 'directories': {}}
+    cached = cache['directories'].get(os.path.abspath(directory), {})
+    entries = {}
+    pending = []
+    dirty = len(cached) != len(files)
+    for file_path, stat in files:
+        entry = cached.get(file_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns \
+                and (entry.get('sha1') or not use_hash):
+            entries[file_path] = entry
+            continue
+        dirty = True
+        if entry and use_hash and entry.get('sha1') == file_sha1(file_path):
+            entries[file_path] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            continue
+        # The stat is taken before reading, so a file changed during the scan is rescanned next time
+        entries[file_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        pending.append(file_path)
+
+    if workers > 1 and len(pending) > CHUNK_SIZE:
+        chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, len(pending), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = [item for chunk in executor.map(partial(scan_files, with_hash=use_hash), chunks) for item in chunk]
+    else:
+        results = scan_files(pending, use_hash)
+
+    for file_path, matches, sha1, minified in results:
+        entries[file_path]['matches'] = matches
+        if sha1:
+            entries[file_path]['sha1'] = sha1
+        if minified:
+            entries[file_path]['minified'] = True
+
+    print(f"Scanned {len(pending)} new or changed files, {len(files) - len(pending)} files loaded from cache")
+    minified_count = sum(1 for entry in entries.values() if entry.get('minified'))
+    if too_large or minified_count:
+        print(f"Skipped {too_large} files over the size limit and {minified_count} minified files")
+    if cache_file and dirty:
+        cache['directories'][os.path.abspath(directory)] = entries
+        save_scan_cache(cache_file, cache)
+
+    # entries follows the sorted file list, so the result is ordered by path
+    return {file_path: [tuple(match) for match in entry['matches']] for file_path, entry in entries.items() if entry['matches']}
+
+def main(input_folder=None, workers="", use_hash="否", ignore_dirs="", ignore_patterns="", use_gitignore="否",
+         max_file_size=""):
+    workers = int(workers) if workers else os.cpu_count() or 1
+    ignore_dirs = [name.strip() for name in (ignore_dirs or DEFAULT_IGNORE_DIRS).split(',') if name.strip()]
+    ignore_patterns = [pattern.strip() for pattern in (ignore_patterns or DEFAULT_IGNORE_PATTERNS).split(',') if pattern.strip()]
+    max_file_size = int(float(max_file_size) * 1024) if max_file_size else DEFAULT_MAX_FILE_SIZE * 1024
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_file = os.path.join(script_dir, 'extracted_chinese_text.md')
+    cache_file = os.path.join(script_dir, SCAN_CACHE_FILE)
+
+    result = extract_chinese_text(input_folder, workers, cache_file, use_hash == "是", ignore_dirs, ignore_patterns,
+                                  use_gitignore == "是", max_file_size)
 
     with open(output_file, 'w', encoding='utf-8') as f:
         if not result:
@@ -53,8 +499,8 @@ def main(input_folder=None):
             f.write("# Extracted Chinese Text\n\n")
             for file_path, texts in result.items():
                 f.write(f"## File: {file_path}\n")
-                for text in texts:
-                    f.write(f"- {text}\n")
+                for text, line, column in texts:
+                    f.write(f"- {text} ({line}:{column})\n")
                 f.write("\n")
 
     print(f"Extraction completed. Results saved to {output_file}")
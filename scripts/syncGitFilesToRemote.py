@@ -4,6 +4,21 @@ import paramiko
 import argparse
 from scp import SCPClient
 import sys
+import json
+import time
+import math
+import zlib
+import struct
+import hashlib
+import shlex
+import socket
+import posixpath
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # 配置
 LOCAL_GIT_DIR = None  # 本地 Git 仓库路径
@@ -13,6 +28,72 @@ REMOTE_PORT = 12288  # 默认 SSH 端口是 22
 REMOTE_USER = None  # 远程服务器的 SSH 用户名
 REMOTE_PASSWORD = None  # 远程服务器的 SSH 密码（也可以使用密钥）
 REMOTE_BASE_DIR = None
+MAX_WORKERS = None  # 同时同步的服务器数量，None 表示全部并行
+TRANSFER_MODE = "bundle"  # bundle: 打包成一个 tar.gz 流传输；file: 逐个文件 scp
+USE_MANIFEST = True  # 对比远程文件清单，跳过内容没有变化的文件
+DELTA_THRESHOLD = 1024 * 1024  # 不小于该大小且远程已存在的文件使用增量传输，0 表示关闭
+DELTA_PROBE_BLOCKS = 8  # 从头扫描这么多块的字节后仍没有匹配的块时放弃增量，整文件发送
+DELTA_SKIP_EXTENSIONS = set()  # 不使用增量传输、直接整文件发送的扩展名，如 .gz；整体改变的文件由 DELTA_PROBE_BLOCKS 尽早放弃
+DRY_RUN = False  # 只输出同步计划，不连接服务器
+CONNECT_TIMEOUT = 10
+
+# 远程清单保存在登录用户目录下，本地按服务器缓存一份
+REMOTE_MANIFEST_DIR = ".cache/syncGitFilesToRemote"
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sync_cache")
+
+POOL_IDLE_TIMEOUT = 600  # 连接池中空闲连接的保留时间（秒）
+POOL_KEEPALIVE = 30  # 空闲连接的 keepalive 间隔（秒）
+
+RETRY_COUNT = 3  # 单个文件或单个包发送失败时的重试次数
+RETRY_BACKOFF = 1  # 第一次重试前等待的秒数，之后每次翻倍
+
+BUNDLE_CHUNK_SIZE = 256 * 1024
+BUNDLE_MAX_FILES = 500  # 每个 tar 包最多包含的文件数，中断后只需重发未确认的包
+BUNDLE_MAX_BYTES = 64 * 1024 * 1024
+MKDIR_BATCH_SIZE = 32 * 1024  # 单条 mkdir 命令的最大长度
+
+# 多线程输出时保证每行完整
+_print_lock = threading.Lock()
+
+# 本次运行中已计算过的文件哈希，多台服务器共用
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+# 本次运行中已计算过的增量，远程文件相同的服务器共用 {(本地路径, 本地 sha1, 远程签名 sha1): 增量或 None}
+_delta_cache = {}
+_delta_lock = threading.Lock()
+
+def log(server, message):
+    prefix = f"[{server}] " if server else ""
+    with _print_lock:
+        sys.stdout.write(f"{prefix}{message}\n")
+
+# 每台服务器在自己的线程中同步，统计数据记录在线程局部变量里
+_local = threading.local()
+
+def new_metrics(server):
+    return {
+        "server": server, "reused_connection": False,
+        "connect_time": 0.0, "auth_time": 0.0, "manifest_time": 0.0, "removal_time": 0.0,
+        "bundle_time": 0.0, "mkdir_time": 0.0, "delta_time": 0.0, "transfer_time": 0.0,
+        "files": 0, "bytes": 0, "source_bytes": 0,
+    }
+
+# 累计代码块耗时到当前服务器的统计中
+@contextmanager
+def measure(name):
+    start = time.time()
+    try:
+        yield
+    finally:
+        metrics = getattr(_local, "metrics", None)
+        if metrics is not None:
+            metrics[name] += time.time() - start
+
+def count(name, value):
+    metrics = getattr(_local, "metrics", None)
+    if metrics is not None:
+        metrics[name] += value
 
 # 创建 SSH 客户端
 def create_ssh_client(server, port, user, password):
@@ -22,77 +103,916 @@ def create_ssh_client(server, port, user, password):
         # 设置自动添加主机密钥策略
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         # 连接到SSH服务器
-        ssh.connect(server, port, user, password)
+        connect_ssh_client(ssh, server, port, user, password)
         # 返回SSH客户端实例
         return ssh
     except Exception as e:
         # 打印连接错误信息
-        print(f"Error connecting to {server}: {e}")
+        log(server, f"Error connecting to {server}: {e}")
         # 返回None表示连接失败
         return None
 
+# 先建立 TCP 连接，再握手认证，分别统计耗时
+# 断开的 SSHClient 也可以再次调用，重新连接后原来的对象可以继续使用
+def connect_ssh_client(ssh, server, port, user, password):
+    with measure("connect_time"):
+        sock = socket.create_connection((server, port), timeout=CONNECT_TIMEOUT)
+        # 逐个文件 scp 时每个文件都有多次小包往返，关闭 Nagle 避免和延迟确认叠加等待
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    with measure("auth_time"):
+        ssh.connect(server, port, user, password, sock=sock, timeout=CONNECT_TIMEOUT)
+    ssh.get_transport().set_keepalive(POOL_KEEPALIVE)
+
+# 失败后按指数退避重试，连接已断开时先重新连接
+def with_retry(ssh_client, server, description, action):
+    for attempt in range(1, RETRY_COUNT + 2):
+        try:
+            return action()
+        except Exception as e:
+            if attempt > RETRY_COUNT:
+                raise
+            delay = RETRY_BACKOFF * 2 ** (attempt - 1)
+            log(server, f"{description}失败，{delay} 秒后第 {attempt} 次重试: {e}")
+            time.sleep(delay)
+
+        transport = ssh_client.get_transport()
+        if transport is None or not transport.is_active():
+            try:
+                ssh_client.close()
+                connect_ssh_client(ssh_client, server, REMOTE_PORT, REMOTE_USER, REMOTE_PASSWORD)
+                log(server, "已重新连接")
+            except Exception as e:
+                log(server, f"重新连接失败: {e}")
+
+# 进程内的 SSH 连接池，按 (地址, 端口, 用户名) 复用已认证的连接
+# GUI 中模块只会导入一次，多次点击执行时可以直接复用，不必重新握手和认证
+class SSHConnectionPool:
+    def __init__(self, idle_timeout=POOL_IDLE_TIMEOUT, keepalive=POOL_KEEPALIVE):
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._idle = {}  # key -> [(ssh_client, password, 放回时间)]
+        self._reaper = None
+
+    # 取出一个可用连接，没有可复用的连接时新建
+    def acquire(self, server, port, user, password):
+        self.evict_idle()
+        key = (server, port, user)
+        while True:
+            with self._lock:
+                entries = self._idle.get(key)
+                if not entries:
+                    break
+                ssh_client, pooled_password, _ = entries.pop()
+            if pooled_password == password and self.is_alive(ssh_client):
+                log(server, "复用已有连接")
+                if getattr(_local, "metrics", None) is not None:
+                    _local.metrics["reused_connection"] = True
+                return ssh_client
+            ssh_client.close()
+
+        return create_ssh_client(server, port, user, password)
+
+    # 用完后放回连接池，已断开的连接直接关闭
+    def release(self, server, port, user, password, ssh_client):
+        transport = ssh_client.get_transport()
+        if transport is None or not transport.is_active():
+            ssh_client.close()
+            return
+        with self._lock:
+            self._idle.setdefault((server, port, user), []).append((ssh_client, password, time.time()))
+        self._start_reaper()
+
+    # 打开一个会话通道来确认连接仍然可用，比重新建立连接快得多
+    def is_alive(self, ssh_client):
+        transport = ssh_client.get_transport()
+        if transport is None or not transport.is_active() or not transport.is_authenticated():
+            return False
+        try:
+            transport.open_session(timeout=5).close()
+            return True
+        except Exception:
+            return False
+
+    # 关闭空闲超时的连接
+    def evict_idle(self):
+        now = time.time()
+        expired = []
+        with self._lock:
+            for key, entries in list(self._idle.items()):
+                keep = []
+                for entry in entries:
+                    (expired if now - entry[2] > self.idle_timeout else keep).append(entry)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for ssh_client, _, _ in expired:
+            ssh_client.close()
+
+    def close_all(self):
+        with self._lock:
+            entries = [entry for entries in self._idle.values() for entry in entries]
+            self._idle.clear()
+        for ssh_client, _, _ in entries:
+            ssh_client.close()
+
+    # 后台定期清理空闲连接，连接池为空时退出
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(min(60, self.idle_timeout))
+            self.evict_idle()
+            with self._lock:
+                if not self._idle:
+                    self._reaper = None
+                    return
+
+connection_pool = SSHConnectionPool()
+
+# 计算本地文件路径和相对于远程目录的路径
+def resolve_paths(local_file):
+    local_file_path = LOCAL_GIT_DIR + local_file
+    relative_path = local_file.replace(DELETE_PATH, '')
+    return local_file_path, relative_path
+
+# 执行远程命令并等待结束，失败时抛出异常
+def run_remote_command(ssh_client, command, input_data=None):
+    stdin, stdout, stderr = ssh_client.exec_command(command)
+    if input_data is not None:
+        stdin.write(input_data)
+        stdin.channel.shutdown_write()
+    output = stdout.read()
+    error = stderr.read()
+    exit_status = stdout.channel.recv_exit_status()
+    if exit_status != 0:
+        message = error.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"远程命令执行失败 (exit {exit_status}): {message}")
+    return output
+
+# 计算需要创建的远程目录：去重，并去掉会被子目录 mkdir -p 顺带创建的父目录
+def collect_remote_dirs(remote_file_paths):
+    dirs = {posixpath.dirname(path.replace("\\", "/")) for path in remote_file_paths}
+    dirs.discard("")
+    ancestors = set()
+    for directory in dirs:
+        parent = posixpath.dirname(directory)
+        while parent not in ancestors and parent != posixpath.dirname(parent):
+            ancestors.add(parent)
+            parent = posixpath.dirname(parent)
+    return sorted(dirs - ancestors)
+
+# 分批创建远程目录，全部完成后才开始传输文件
+def ensure_remote_dirs(ssh_client, remote_dirs, server):
+    batches = []
+    batch, length = [], 0
+    for directory in remote_dirs:
+        quoted = shlex.quote(directory)
+        if batch and length + len(quoted) > MKDIR_BATCH_SIZE:
+            batches.append(batch)
+            batch, length = [], 0
+        batch.append(quoted)
+        length += len(quoted) + 1
+    if batch:
+        batches.append(batch)
+
+    with measure("mkdir_time"):
+        for batch in batches:
+            run_remote_command(ssh_client, "mkdir -p -- " + " ".join(batch))
+    log(server, f"已创建远程目录 {len(remote_dirs)} 个 ({len(batches)} 条命令)")
+
 # 使用 SCP 复制文件到远程服务器
-def copy_files_to_remote(ssh_client, local_files):
+def copy_files_to_remote(ssh_client, local_files, server):
     try:
-        scp = SCPClient(ssh_client.get_transport())
+        transfers = []
         for local_file in local_files:
             # 计算相对于 LOCAL_GIT_DIR 的相对路径
-            local_file_path = LOCAL_GIT_DIR + local_file
-            local_file = local_file.replace(DELETE_PATH, '')
-            remote_file_path = REMOTE_BASE_DIR + local_file
-            
-            # 确保远程路径的目录存在
-            remote_dir = os.path.dirname(remote_file_path)
-            ssh_client.exec_command(f"mkdir -p {remote_dir}")
-            
-            # 复制文件到远程路径
-            print(f"【{local_file}】->【{remote_file_path}】")
-            scp.put(local_file_path, remote_file_path)
+            local_file_path, relative_path = resolve_paths(local_file)
+            transfers.append((local_file, local_file_path, relative_path, REMOTE_BASE_DIR + relative_path))
+
+        # 确保远程路径的目录存在
+        remote_dirs = collect_remote_dirs(transfer[3] for transfer in transfers)
+        with_retry(ssh_client, server, "创建远程目录", lambda: ensure_remote_dirs(ssh_client, remote_dirs, server))
+
+        for local_file, local_file_path, relative_path, remote_file_path in transfers:
+            # 复制文件到远程路径，重连后 transport 会变，每次重新创建 SCPClient
+            log(server, f"【{relative_path}】->【{remote_file_path}】")
+            with measure("transfer_time"):
+                with_retry(ssh_client, server, f"发送 {relative_path} ",
+                           lambda: SCPClient(ssh_client.get_transport()).put(local_file_path, remote_file_path))
+            size = os.path.getsize(local_file_path)
+            count("files", 1)
+            count("bytes", size)
+            count("source_bytes", size)
+            confirm_sent(local_file)
         
-        print("发送成功")
+        log(server, "发送成功")
+        return True, ""
     except Exception as e:
-        print(f"发送失败了TAT: {e}")
+        log(server, f"发送失败了TAT: {e}")
+        return False, str(e)
+
+# 计算本地文件的 sha1，同一文件只计算一次
+def file_sha1(local_file_path, size, mtime):
+    key = (local_file_path, size, mtime)
+    with _hash_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+    sha1 = hashlib.sha1()
+    with open(local_file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    with _hash_lock:
+        _hash_cache[key] = sha1.hexdigest()
+    return _hash_cache[key]
+
+def manifest_id():
+    return hashlib.sha1(REMOTE_BASE_DIR.encode("utf-8")).hexdigest()[:16]
+
+def local_manifest_path(server):
+    return os.path.join(CACHE_DIR, f"{server}_{REMOTE_PORT}_{manifest_id()}.json")
+
+def save_local_manifest(server, stamp, files):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(local_manifest_path(server), "w", encoding="utf-8") as f:
+        json.dump({"stamp": stamp, "files": files}, f, separators=(",", ":"))
+
+# 读取远程清单 {相对路径: [大小, 修改时间, sha1]}
+# 远程清单没变时（大小、修改时间、inode 与本地缓存一致）直接使用本地缓存，只需一次往返
+def load_manifest(ssh_client, server):
+    cache = {"stamp": "", "files": {}}
+    if os.path.exists(local_manifest_path(server)):
+        with open(local_manifest_path(server), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    path = shlex.quote(f"{REMOTE_MANIFEST_DIR}/{manifest_id()}.json")
+    command = (
+        f"stamp=$(stat -c '%s %Y %i' {path} 2>/dev/null) || exit 0; "
+        f"if [ \"$stamp\" = {shlex.quote(cache['stamp'] or '')} ]; then echo SAME; "
+        f"else echo \"$stamp\"; cat {path}; fi"
+    )
+    output = run_remote_command(ssh_client, command).decode("utf-8")
+    if not output:
+        return {}
+    stamp, _, body = output.partition("\n")
+    if stamp == "SAME":
+        return cache["files"]
+    files = json.loads(body)["files"]
+    save_local_manifest(server, stamp, files)
+    return files
+
+# 写回远程清单，同时更新本地缓存
+def save_manifest(ssh_client, server, files):
+    path = shlex.quote(f"{REMOTE_MANIFEST_DIR}/{manifest_id()}.json")
+    data = json.dumps({"files": files}, separators=(",", ":")).encode("utf-8")
+    command = (
+        f"mkdir -p {shlex.quote(REMOTE_MANIFEST_DIR)} && cat > {path}.tmp && "
+        f"mv -f {path}.tmp {path} && stat -c '%s %Y %i' {path}"
+    )
+    stamp = run_remote_command(ssh_client, command, data).decode("utf-8").strip()
+    save_local_manifest(server, stamp, files)
+
+# 对比远程清单，只保留内容有变化的文件
+# 大小和修改时间都一致时直接跳过，否则再比较 sha1
+def filter_unchanged(local_files, manifest):
+    changed = []
+    updates = {}
+    for local_file in local_files:
+        local_file_path, relative_path = resolve_paths(local_file)
+        try:
+            stat = os.stat(local_file_path)
+        except OSError:
+            changed.append(local_file)
+            continue
+
+        size, mtime = stat.st_size, int(stat.st_mtime)
+        entry = manifest.get(relative_path)
+        if entry and entry[0] == size and entry[1] == mtime:
+            continue
+
+        digest = file_sha1(local_file_path, size, mtime)
+        updates[relative_path] = [size, mtime, digest]
+        if not (entry and entry[0] == size and entry[2] == digest):
+            changed.append(local_file)
+    return changed, updates
+
+# 远程增量合并脚本，通过 SSH exec 通道以 python -c 运行，兼容 Python 2/3
+# sig: 按块输出远程文件的 adler32 弱校验和 sha1 强校验
+# patch: 从 stdin 读取增量指令，在同目录临时文件中重建后原子替换原文件
+REMOTE_DELTA_HELPER = r'''
+import hashlib, os, struct, sys, tempfile, zlib
+mode, path, block_size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+out = getattr(sys.stdout, "buffer", sys.stdout)
+inp = getattr(sys.stdin, "buffer", sys.stdin)
+def read_exact(n):
+    data = inp.read(n)
+    if len(data) != n:
+        raise IOError("unexpected end of delta stream")
+    return data
+if mode == "sig":
+    if not os.path.isfile(path):
+        out.write(b"MISSING\n")
+        sys.exit(0)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            line = "%d %s\n" % (zlib.adler32(block) & 0xffffffff, hashlib.sha1(block).hexdigest())
+            out.write(line.encode("ascii"))
+    sys.exit(0)
+fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".delta-")
+try:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as src:
+        with os.fdopen(fd, "wb") as dst:
+            while True:
+                op = read_exact(1)
+                if op == b"C":
+                    index, count = struct.unpack(">II", read_exact(8))
+                    src.seek(index * block_size)
+                    data = src.read(count * block_size)
+                elif op == b"L":
+                    data = read_exact(struct.unpack(">I", read_exact(4))[0])
+                elif op == b"E":
+                    break
+                else:
+                    raise IOError("bad delta op")
+                sha1.update(data)
+                dst.write(data)
+            if read_exact(40).decode("ascii") != sha1.hexdigest():
+                raise IOError("checksum mismatch")
+            dst.flush()
+            os.fsync(dst.fileno())
+    os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    os.rename(tmp, path)
+except Exception:
+    os.unlink(tmp)
+    raise
+'''
+
+# 根据文件大小选择分块大小，与 rsync 一样取文件大小的平方根
+def delta_block_size(size):
+    return max(2048, min(64 * 1024, int(math.sqrt(size)) // 8 * 8))
+
+# rsync 算法：用滚动 adler32 在本地文件中查找远程已有的块，只发送不匹配的字节
+# 返回增量指令流；不匹配的字节超过文件一半，或开头 DELTA_PROBE_BLOCKS 个块的字节内没有匹配时返回 None，直接整文件发送更划算
+def compute_delta(data, signature, block_size):
+    blocks = {}
+    for index, (weak, strong) in enumerate(signature):
+        blocks.setdefault(weak, []).append((strong, index))
+
+    size = len(data)
+    max_literal = size // 2
+    modulus = 65521
+    delta = bytearray()
+    literal_bytes = 0
+    literal_start = 0
+    last_copy = None  # [index, count]，合并连续的块
+    pos = 0
+    a = b = 0
+    if size >= block_size:
+        weak = zlib.adler32(data[0:block_size])
+        a, b = weak & 0xffff, weak >> 16
+
+    while pos + block_size <= size:
+        matched = None
+        candidates = blocks.get((b << 16) | a)
+        if candidates:
+            strong = hashlib.sha1(data[pos:pos + block_size]).hexdigest()
+            matched = next((index for digest, index in candidates if digest == strong), None)
+
+        if matched is not None:
+            if literal_start < pos:
+                delta += b"L" + struct.pack(">I", pos - literal_start) + data[literal_start:pos]
+                last_copy = None
+            if last_copy and last_copy[0] + last_copy[1] == matched:
+                last_copy[1] += 1
+                delta[-4:] = struct.pack(">I", last_copy[1])
+            else:
+                last_copy = [matched, 1]
+                delta += b"C" + struct.pack(">II", matched, 1)
+            pos += block_size
+            literal_start = pos
+            if pos + block_size <= size:
+                weak = zlib.adler32(data[pos:pos + block_size])
+                a, b = weak & 0xffff, weak >> 16
+            continue
+
+        if pos + block_size == size:
+            break
+        # 窗口右移一个字节
+        out_byte, in_byte = data[pos], data[pos + block_size]
+        a = (a - out_byte + in_byte) % modulus
+        b = (b - block_size * out_byte + a - 1) % modulus
+        pos += 1
+        if literal_bytes + pos - literal_start > max_literal:
+            return None
+        if literal_start == 0 and pos >= DELTA_PROBE_BLOCKS * block_size:
+            return None  # 文件整体改变了，继续逐字节滚动只是白白占用 CPU
+        if pos - literal_start >= 1024 * 1024:
+            # 过长的字面量分段写出，避免单条指令过大
+            delta += b"L" + struct.pack(">I", pos - literal_start) + data[literal_start:pos]
+            literal_bytes += pos - literal_start
+            literal_start = pos
+            last_copy = None
+
+    if literal_start < size:
+        literal_bytes += size - literal_start
+        if literal_bytes > max_literal:
+            return None
+        delta += b"L" + struct.pack(">I", size - literal_start) + data[literal_start:]
+    delta += b"E" + hashlib.sha1(data).hexdigest().encode("ascii")
+    return bytes(delta)
+
+def remote_helper_command(mode, remote_file_path, block_size):
+    python = '"$(command -v python3 || command -v python)"'
+    return f"{python} -c {shlex.quote(REMOTE_DELTA_HELPER)} {mode} {shlex.quote(remote_file_path)} {block_size}"
+
+# 增量传输单个文件，远程没有该文件或增量不划算时返回 False
+def send_file_by_delta(ssh_client, local_file_path, remote_file_path, server):
+    with open(local_file_path, "rb") as f:
+        data = f.read()
+    block_size = delta_block_size(len(data))
+    output = run_remote_command(ssh_client, remote_helper_command("sig", remote_file_path, block_size))
+    if output.startswith(b"MISSING"):
+        return False
+
+    key = (local_file_path, hashlib.sha1(data).hexdigest(), hashlib.sha1(output).hexdigest())
+    with _delta_lock:
+        if key not in _delta_cache:
+            signature = []
+            for line in output.decode("ascii").splitlines():
+                weak, strong = line.split()
+                signature.append((int(weak), strong))
+            _delta_cache[key] = compute_delta(data, signature, block_size)
+        delta = _delta_cache[key]
+    if delta is None:
+        return False
 
-# 获取本地 Git 仓库中的修改文件
+    run_remote_command(ssh_client, remote_helper_command("patch", remote_file_path, block_size), delta)
+    count("files", 1)
+    count("bytes", len(delta))
+    count("source_bytes", len(data))
+    log(server, f"【增量】{remote_file_path}: 发送 {len(delta) / 1024:.1f} KB / 文件 {len(data) / 1024:.1f} KB")
+    return True
+
+# 大文件先尝试增量传输，返回仍需整文件发送的文件
+def send_large_files_by_delta(ssh_client, local_files, server):
+    remaining = []
+    for local_file in local_files:
+        local_file_path, relative_path = resolve_paths(local_file)
+        try:
+            if os.path.getsize(local_file_path) < DELTA_THRESHOLD \
+                    or os.path.splitext(local_file_path)[1].lower() in DELTA_SKIP_EXTENSIONS:
+                remaining.append(local_file)
+                continue
+        except OSError:
+            remaining.append(local_file)
+            continue
+
+        try:
+            with measure("delta_time"):
+                sent = send_file_by_delta(ssh_client, local_file_path, REMOTE_BASE_DIR + relative_path, server)
+            if sent:
+                confirm_sent(local_file)
+                continue
+        except Exception as e:
+            log(server, f"增量传输失败，改为整文件发送 {relative_path}: {e}")
+        remaining.append(local_file)
+    return remaining
+
+def journal_path(server):
+    return os.path.join(CACHE_DIR, f"journal_{server}_{REMOTE_PORT}_{manifest_id()}.jsonl")
+
+# 读取上次中断前已被远程确认的文件 {相对路径: sha1}
+def load_journal(server):
+    entries = {}
+    if not os.path.exists(journal_path(server)):
+        return entries
+    with open(journal_path(server), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # 中断时写了一半的行
+            entries[entry["path"]] = entry["sha1"]
+    return entries
+
+# 远程确认收到文件后（scp 应答、tar 或增量合并成功退出）记录到当前服务器的日志
+def confirm_sent(local_file):
+    journal = getattr(_local, "journal", None)
+    if journal is None:
+        return
+    local_file_path, relative_path = resolve_paths(local_file)
+    stat = os.stat(local_file_path)
+    digest = file_sha1(local_file_path, stat.st_size, int(stat.st_mtime))
+    journal.write(json.dumps({"path": relative_path, "sha1": digest, "size": stat.st_size}, ensure_ascii=False) + "\n")
+    journal.flush()
+
+# 跳过上次已经发送成功、之后内容也没有变化的文件
+def skip_journaled(local_files, journal_entries):
+    remaining = []
+    for local_file in local_files:
+        local_file_path, relative_path = resolve_paths(local_file)
+        digest = journal_entries.get(relative_path)
+        if digest is not None and os.path.isfile(local_file_path):
+            stat = os.stat(local_file_path)
+            if file_sha1(local_file_path, stat.st_size, int(stat.st_mtime)) == digest:
+                continue
+        remaining.append(local_file)
+    return remaining
+
+# 去掉本地的属主和权限：Windows 上 os.stat 得到的权限是 0666，原样解压会让文件所有人可写
+def normalize_tarinfo(tarinfo):
+    tarinfo.mode = 0o755 if tarinfo.mode & 0o100 else 0o644
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ""
+    return tarinfo
+
+# 将所有文件打包成一个 tar.gz 临时文件
+def build_bundle(local_files):
+    fd, bundle_path = tempfile.mkstemp(suffix=".tar.gz")
+    with os.fdopen(fd, "wb") as f, tarfile.open(fileobj=f, mode="w:gz", compresslevel=6) as tar:
+        for local_file in local_files:
+            local_file_path, relative_path = resolve_paths(local_file)
+            log(None, f"【{relative_path}】->【{REMOTE_BASE_DIR + relative_path}】")
+            tar.add(local_file_path, arcname=relative_path, recursive=False, filter=normalize_tarinfo)
+    return bundle_path
+
+# 通过一个 SSH 通道发送 tar 包，并在远程一次性解压
+def send_bundle_to_remote(ssh_client, bundle_path, file_count, server):
+    remote_dir = shlex.quote(REMOTE_BASE_DIR)
+    channel = ssh_client.get_transport().open_session()
+    try:
+        # 以 root 解压时 tar 默认还原包里的属主和权限，这里改为归登录用户所有并按 umask 设置权限
+        channel.exec_command(f"mkdir -p {remote_dir} && tar --no-same-owner --no-same-permissions -xzf - -C {remote_dir}")
+        output = []
+        size = os.path.getsize(bundle_path)
+        log(server, f"打包发送 {file_count} 个文件 ({size / 1024:.1f} KB)")
+        with measure("transfer_time"), open(bundle_path, "rb") as f:
+            for chunk in iter(lambda: f.read(BUNDLE_CHUNK_SIZE), b""):
+                channel.sendall(chunk)
+                # 及时读取远程输出，避免缓冲区写满导致阻塞
+                while channel.recv_stderr_ready():
+                    output.append(channel.recv_stderr(BUNDLE_CHUNK_SIZE))
+            channel.shutdown_write()
+            exit_status = channel.recv_exit_status()
+        while channel.recv_stderr_ready():
+            output.append(channel.recv_stderr(BUNDLE_CHUNK_SIZE))
+    finally:
+        channel.close()
+
+    if exit_status != 0:
+        message = b"".join(output).decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"远程解压失败 (exit {exit_status}): {message}")
+    count("files", file_count)
+    count("bytes", size)
+    log(server, "发送成功")
+
+# 按文件列表缓存 tar 包，要发送的文件相同的服务器共用同一个包
+class BundleCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bundles = {}
+
+    def get(self, local_files):
+        key = tuple(local_files)
+        with self._lock:
+            if key not in self._bundles:
+                with measure("bundle_time"):
+                    self._bundles[key] = build_bundle(local_files)
+            return self._bundles[key]
+
+    def cleanup(self):
+        for bundle_path in self._bundles.values():
+            os.remove(bundle_path)
+        self._bundles.clear()
+
+# 按文件数和大小把文件分成多个包
+def split_bundles(local_files):
+    chunks = []
+    chunk, chunk_bytes = [], 0
+    for local_file in local_files:
+        local_file_path = resolve_paths(local_file)[0]
+        size = os.path.getsize(local_file_path) if os.path.isfile(local_file_path) else 0
+        if chunk and (len(chunk) >= BUNDLE_MAX_FILES or chunk_bytes + size > BUNDLE_MAX_BYTES):
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append(local_file)
+        chunk_bytes += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+# 按传输方式发送文件，打包传输失败时剩余文件退回逐个文件传输
+def transfer_files(ssh_client, files_to_copy, bundles, server):
+    if bundles is None:
+        return copy_files_to_remote(ssh_client, files_to_copy, server)
+    sent = 0
+    try:
+        for chunk in split_bundles(files_to_copy):
+            bundle_path = bundles.get(chunk)
+            with_retry(ssh_client, server, "打包发送",
+                       lambda: send_bundle_to_remote(ssh_client, bundle_path, len(chunk), server))
+            count("source_bytes", sum(os.path.getsize(resolve_paths(path)[0]) for path in chunk))
+            for local_file in chunk:
+                confirm_sent(local_file)
+            sent += len(chunk)
+        return True, ""
+    except Exception as e:
+        log(server, f"打包传输失败，剩余文件改为逐个文件传输: {e}")
+        return copy_files_to_remote(ssh_client, files_to_copy[sent:], server)
+
+# 同步到单台服务器，每台服务器使用独立的连接
+def sync_to_server(server, plan, bundles=None):
+    start = time.time()
+    _local.metrics = new_metrics(server)
+    log(server, "正在连接...")
+    ssh_client = connection_pool.acquire(server, REMOTE_PORT, REMOTE_USER, REMOTE_PASSWORD)
+
+    if ssh_client is None:
+        return host_result(server, False, "无法连接到远程服务器", start)
+
+    try:
+        # 先删除和重命名，原文件不存在的重命名改为上传
+        files_to_copy = list(plan["puts"])
+        with measure("removal_time"):
+            missing = with_retry(ssh_client, server, "删除和重命名", lambda: apply_removals(ssh_client, plan, server))
+        for path in missing:
+            if path not in files_to_copy:
+                files_to_copy.append(path)
+
+        manifest, updates = None, {}
+        manifest_changed = bool(plan["deletes"] or plan["renames"])
+        if USE_MANIFEST:
+            try:
+                with measure("manifest_time"):
+                    manifest = load_manifest(ssh_client, server)
+                    apply_removals_to_manifest(manifest, plan)
+                    files_to_copy, updates = filter_unchanged(files_to_copy, manifest)
+                log(server, f"对比远程清单: {len(files_to_copy)} 个文件有变化")
+            except Exception as e:
+                manifest = None
+                log(server, f"读取远程清单失败，发送全部文件: {e}")
+
+        # 上次同步中断时，跳过已经确认发送的文件
+        journal_entries = load_journal(server)
+        if journal_entries:
+            remaining = skip_journaled(files_to_copy, journal_entries)
+            log(server, f"从上次中断处继续，跳过 {len(files_to_copy) - len(remaining)} 个已发送的文件")
+            files_to_copy = remaining
+
+        if not files_to_copy:
+            log(server, "没有需要上传的文件")
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _local.journal = open(journal_path(server), "a", encoding="utf-8")
+        try:
+            # 大文件只发送变化的块
+            if files_to_copy and DELTA_THRESHOLD:
+                files_to_copy = send_large_files_by_delta(ssh_client, files_to_copy, server)
+
+            # 复制文件到远程设备
+            success, message = True, ""
+            if files_to_copy:
+                success, message = transfer_files(ssh_client, files_to_copy, bundles, server)
+        finally:
+            _local.journal.close()
+            _local.journal = None
+
+        if success and manifest is not None and (updates or manifest_changed):
+            manifest.update(updates)
+            with measure("manifest_time"):
+                save_manifest(ssh_client, server, manifest)
+        # 全部完成后不再需要断点记录
+        if success:
+            os.remove(journal_path(server))
+    except Exception as e:
+        success, message = False, str(e)
+        log(server, f"同步失败: {e}")
+
+    # 成功后把连接放回连接池，失败的连接可能已损坏，直接关闭
+    if success:
+        connection_pool.release(server, REMOTE_PORT, REMOTE_USER, REMOTE_PASSWORD, ssh_client)
+    else:
+        ssh_client.close()
+
+    return host_result(server, success, message, start)
+
+# 汇总单台服务器的结果和统计数据
+def host_result(server, success, message, start):
+    elapsed = time.time() - start
+    metrics = _local.metrics
+    _local.metrics = None
+    moving_time = metrics["transfer_time"] + metrics["delta_time"]
+    metrics["success"] = success
+    metrics["total_time"] = elapsed
+    metrics["bytes_per_sec"] = metrics["bytes"] / moving_time if moving_time else 0.0
+    metrics["files_per_sec"] = metrics["files"] / moving_time if moving_time else 0.0
+    for key, value in metrics.items():
+        if isinstance(value, float):
+            metrics[key] = round(value, 3)
+    return {"server": server, "success": success, "message": message, "elapsed": elapsed, "metrics": metrics}
+
+# 并发同步到所有服务器，单台失败不影响其他服务器
+def sync_to_servers(servers, plan, max_workers=None, bundles=None):
+    workers = max(1, min(max_workers or len(servers), len(servers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(sync_to_server, server, plan, bundles) for server in servers]
+        results = []
+        for server, future in zip(servers, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"server": server, "success": False, "message": str(e), "elapsed": 0})
+    return results
+
+def print_summary(results):
+    print("\n同步结果汇总:")
+    for result in results:
+        if result["success"]:
+            print(f"  ✅ {result['server']} 成功 ({result['elapsed']:.1f}s)")
+        else:
+            print(f"  ❌ {result['server']} 失败: {result['message']} ({result['elapsed']:.1f}s)")
+    failed = sum(1 for result in results if not result["success"])
+    print(f"共 {len(results)} 台，成功 {len(results) - failed} 台，失败 {failed} 台")
+
+# 输出 JSON 格式的统计数据，并追加到本地记录文件，便于比较多次同步
+def emit_metrics(results, mode):
+    summary = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "transfer_mode": TRANSFER_MODE,
+        "hosts": [result.get("metrics") or {"server": result["server"], "success": False} for result in results],
+    }
+    print("\n同步统计:")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, "metrics.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+# 只输出同步计划，不连接服务器
+def print_dry_run(plan):
+    total_bytes = 0
+    print("同步计划（仅预览，不会发送）:")
+    for local_file in plan["puts"]:
+        local_file_path, relative_path = resolve_paths(local_file)
+        size = os.path.getsize(local_file_path) if os.path.isfile(local_file_path) else 0
+        total_bytes += size
+        print(f"  上传 【{relative_path}】->【{REMOTE_BASE_DIR + relative_path}】 ({size / 1024:.1f} KB)")
+    for path in plan["deletes"]:
+        print(f"  删除 【{REMOTE_BASE_DIR + resolve_paths(path)[1]}】")
+    for old_path, new_path in plan["renames"]:
+        print(f"  重命名 【{REMOTE_BASE_DIR + resolve_paths(old_path)[1]}】->【{REMOTE_BASE_DIR + resolve_paths(new_path)[1]}】")
+
+    targets = [REMOTE_BASE_DIR + resolve_paths(path)[1] for path in plan["puts"]]
+    targets += [REMOTE_BASE_DIR + resolve_paths(new_path)[1] for _, new_path in plan["renames"]]
+    remote_dirs = collect_remote_dirs(targets)
+    print(f"需要创建的远程目录 ({len(remote_dirs)} 个):")
+    for remote_dir in remote_dirs:
+        print(f"  {remote_dir}")
+    print(f"目标服务器: {', '.join(REMOTE_SERVERS)}")
+    print(f"共上传 {len(plan['puts'])} 个文件 ({total_bytes / 1024:.1f} KB)，"
+          f"删除 {len(plan['deletes'])} 个，重命名 {len(plan['renames'])} 个")
+
+def new_change_plan(puts=None):
+    # puts: 需要上传的文件；deletes: 需要删除的文件；renames: [(旧路径, 新路径)]
+    return {"puts": puts or [], "deletes": [], "renames": []}
+
+# 根据本地 Git 仓库中未提交的修改生成同步计划
 def get_modified_files():
+    plan = new_change_plan()
     try:
         repo = git.Repo(LOCAL_GIT_DIR)
-        modified_files = []
-        # 获取所有未提交的修改
-        for item in repo.git.status(porcelain=True).splitlines():
-            status, path = item[:2].strip(), item[3:]
-            if status in {"M", "A", "D", "R", "C", "??"}:  # M=Modified, A=Added, ??=Untracked
-                modified_files.append(path)
-        return modified_files
+        # porcelain v2 能区分重命名前后的路径和相似度，-uall 列出未跟踪目录下的每个文件
+        records = iter(repo.git.status("--porcelain=v2", "-z", "--untracked-files=all").split("\0"))
     except git.exc.InvalidGitRepositoryError as e:
         print(f"获取本地修改失败: {e}")
+        return plan
+
+    for record in records:
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "?":  # 未跟踪的文件
+            plan["puts"].append(record[2:])
+        elif kind == "1":  # 普通修改: 1 XY sub mH mI mW hH hI path
+            fields = record.split(" ", 8)
+            status, path = fields[1], fields[8]
+            if "D" in status:
+                plan["deletes"].append(path)
+            else:
+                plan["puts"].append(path)
+        elif kind == "2":  # 重命名/复制: 2 XY sub mH mI mW hH hI Xscore path，下一条记录是原路径
+            fields = record.split(" ", 9)
+            status, score, path = fields[1], fields[8], fields[9]
+            original_path = next(records)
+            if status[0] == "R":
+                if status[1] == "D":
+                    plan["deletes"].append(original_path)
+                    continue
+                plan["renames"].append((original_path, path))
+                # 内容也有修改时，移动后还要上传新内容
+                if score != "R100" or status[1] != ".":
+                    plan["puts"].append(path)
+            else:
+                plan["puts"].append(path)
+        elif kind == "u":  # 有冲突的文件: u XY sub m1 m2 m3 mW h1 h2 h3 path
+            plan["puts"].append(record.split(" ", 10)[10])
+    return plan
+
+# 在远程一次性执行所有删除和重命名，返回远程找不到原文件、需要改为上传的新路径
+def apply_removals(ssh_client, plan, server):
+    lines = []
+    deletes = [shlex.quote(REMOTE_BASE_DIR + resolve_paths(path)[1]) for path in plan["deletes"]]
+    for i in range(0, len(deletes), 200):
+        lines.append("rm -f -- " + " ".join(deletes[i:i + 200]))
+
+    renamed = {}
+    for old_path, new_path in plan["renames"]:
+        renamed[REMOTE_BASE_DIR + resolve_paths(new_path)[1]] = (old_path, new_path)
+    for remote_dir in collect_remote_dirs(renamed):
+        lines.append(f"mkdir -p -- {shlex.quote(remote_dir)}")
+    for remote_new, (old_path, _) in renamed.items():
+        old, new = shlex.quote(REMOTE_BASE_DIR + resolve_paths(old_path)[1]), shlex.quote(remote_new)
+        lines.append(f"if [ -e {old} ]; then mv -f -- {old} {new}; else printf '%s\\n' {new}; fi")
+
+    if not lines:
         return []
+    output = run_remote_command(ssh_client, "sh -s", ("\n".join(lines) + "\n").encode("utf-8"))
+    missing = [renamed[path][1] for path in output.decode("utf-8").splitlines() if path in renamed]
+    log(server, f"已删除 {len(plan['deletes'])} 个文件，重命名 {len(renamed) - len(missing)} 个文件")
+    return missing
 
-# 获取本地 Git 仓库中的所有文件
-def get_all_files():    
-    all_files = []
-    for root, dirs, files in os.walk(LOCAL_GIT_DIR):
-        print(files)
-        for file in files:
-            all_files.append(os.path.join(root, file))
+# 删除和重命名后同步更新远程清单
+def apply_removals_to_manifest(manifest, plan):
+    for path in plan["deletes"]:
+        manifest.pop(resolve_paths(path)[1], None)
+    for old_path, new_path in plan["renames"]:
+        entry = manifest.pop(resolve_paths(old_path)[1], None)
+        if entry is not None:
+            manifest[resolve_paths(new_path)[1]] = entry
+
+# 通过 git 索引逐个列出已跟踪和未被忽略的文件
+# .git、node_modules、构建输出等被 .gitignore 忽略的目录不会被遍历
+# 设置了 delete_path 时只列出该目录下的文件
+def iter_all_files():
+    repo = git.Repo(LOCAL_GIT_DIR)
+    args = ["-z", "--cached", "--others", "--exclude-standard"]
+    if DELETE_PATH:
+        args += ["--", DELETE_PATH]
+    process = repo.git.ls_files(*args, as_process=True)
 
-    return all_files
+    pending = b""
+    last_path = None
+    for chunk in iter(lambda: process.stdout.read(64 * 1024), b""):
+        *paths, pending = (pending + chunk).split(b"\0")
+        for path in paths:
+            path = path.decode("utf-8")
+            # 冲突文件会按暂存区阶段重复出现；已在工作区删除的文件不需要推送
+            if path == last_path or not os.path.isfile(LOCAL_GIT_DIR + path):
+                continue
+            last_path = path
+            yield path
+    process.wait()
 
-def main(input_folder=None, delete_path="",remote_server=None,prot=22,username=None,password=None,remote_folder=None):
+# 获取本地 Git 仓库中的所有文件
+def get_all_files():
+    return list(iter_all_files())
+
+def main(input_folder=None, delete_path="",remote_server=None,prot=22,username=None,password=None,remote_folder=None,max_workers=None,transfer_mode="bundle",use_manifest="是",delta_threshold="1",delta_skip_extensions="",dry_run="否"):
     global LOCAL_GIT_DIR
-    LOCAL_GIT_DIR = input_folder
+    LOCAL_GIT_DIR = os.path.join(input_folder, "")  # 保证以路径分隔符结尾，后面直接拼接相对路径
     global DELETE_PATH
     DELETE_PATH = delete_path
     global REMOTE_SERVERS
-    REMOTE_SERVERS = remote_server.split(',')
+    REMOTE_SERVERS = [server.strip() for server in remote_server.split(',') if server.strip()]
     global REMOTE_PORT
-    REMOTE_PORT = prot
+    REMOTE_PORT = int(prot or 22)
     global REMOTE_USER
     REMOTE_USER = username
     global REMOTE_PASSWORD
     REMOTE_PASSWORD = password
     global REMOTE_BASE_DIR
     REMOTE_BASE_DIR = remote_folder
+    global MAX_WORKERS
+    MAX_WORKERS = int(max_workers) if max_workers else None
+    global TRANSFER_MODE
+    TRANSFER_MODE = transfer_mode or "bundle"
+    global USE_MANIFEST
+    USE_MANIFEST = use_manifest != "否"
+    global DELTA_THRESHOLD
+    DELTA_THRESHOLD = int(float(delta_threshold or 1) * 1024 * 1024)
+    global DELTA_SKIP_EXTENSIONS
+    DELTA_SKIP_EXTENSIONS = {"." + ext.strip().lstrip(".").lower() for ext in (delta_skip_extensions or "").split(",") if ext.strip()}
+    global DRY_RUN
+    DRY_RUN = dry_run == "是"
+    _hash_cache.clear()
+    _delta_cache.clear()
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="同步 Git 文件到远程设备")
     parser.add_argument(
@@ -104,31 +1024,33 @@ def main(input_folder=None, delete_path="",remote_server=None,prot=22,username=N
     # 根据选择的模式获取文件
     if args.mode == 'full':
         # 获取仓库中的所有文件
-        files_to_copy = get_all_files()
+        plan = new_change_plan(get_all_files())
         print("选择全量推送: 推送所有文件")
     else:
         # 获取修改过的文件
-        files_to_copy = get_modified_files()
+        plan = get_modified_files()
         print("选择仅推送修改过的文件")
 
-    if not files_to_copy:
+    if not (plan["puts"] or plan["deletes"] or plan["renames"]):
         print("没有要推送的文件.")
         return
+    print(f"上传 {len(plan['puts'])} 个文件，删除 {len(plan['deletes'])} 个文件，重命名 {len(plan['renames'])} 个文件")
 
-    # 创建 SSH 客户端
-    for server in REMOTE_SERVERS:
-        print(f"正在连接到 {server}...")
-        ssh_client = create_ssh_client(server, REMOTE_PORT, REMOTE_USER, REMOTE_PASSWORD)
-        
-        if ssh_client is None:
-            print("无法连接到远程服务器.")
-            return
+    if DRY_RUN:
+        print_dry_run(plan)
+        return
 
-        # 复制文件到远程设备
-        copy_files_to_remote(ssh_client, files_to_copy)
+    # 打包模式下相同的文件列表只打包一次，多台服务器共用
+    bundles = BundleCache() if TRANSFER_MODE == "bundle" else None
 
-        # 关闭 SSH 连接
-        ssh_client.close()
+    # 并发同步到所有服务器
+    try:
+        results = sync_to_servers(REMOTE_SERVERS, plan, MAX_WORKERS, bundles)
+    finally:
+        if bundles is not None:
+            bundles.cleanup()
+    print_summary(results)
+    emit_metrics(results, args.mode)
 
 if __name__ == "__main__":
     main()